@@ -0,0 +1,136 @@
+"""
+Neighborhood and degree-of-separation analytics for degrees.
+
+Each source costs a single breadth-first sweep, which counts everyone
+at every distance from it at once, instead of one shortest_path call
+per pair. Sweeps from different sources run across a process pool.
+
+Usage:
+    python analytics.py [-d directory] khop NAME K
+    python analytics.py [-d directory] histogram [--samples N] [--seed S]
+"""
+import argparse
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import as_completed
+
+import degrees
+import service
+
+
+def k_hop_counts(person_id, k):
+    """
+    Returns a list whose item d is the number of people exactly d
+    degrees of separation from person_id, for d from 0 to k.
+    """
+    counts = degrees.distance_counts(person_id, max_depth=k)
+    return counts + [0] * (k + 1 - len(counts))
+
+
+def within(person_id, k):
+    """
+    Returns the number of other people within k degrees of person_id.
+    """
+    return sum(k_hop_counts(person_id, k)[1:])
+
+
+def distance_histogram(samples, directory, backend, workers=None, seed=0,
+                       progress=None):
+    """
+    Returns a Counter of degrees of separation over all pairs from
+    `samples` random sources to every other person, with pairs that are
+    not connected counted under None.
+
+    Sources are swept in a pool of `workers` processes, which share the
+    graph already loaded from directory with backend where they can, and
+    progress(done, total) is called as each sweep finishes.
+    """
+    person_ids = sorted(degrees.people)
+    rng = random.Random(seed)
+    sources = rng.sample(person_ids, min(samples, len(person_ids)))
+
+    histogram = Counter()
+
+    def add(counts):
+        for distance, count in enumerate(counts[1:], start=1):
+            histogram[distance] += count
+        histogram[None] += len(person_ids) - sum(counts)
+
+    executor = service.make_executor(
+        workers or os.cpu_count(), directory, backend
+    )
+    if executor is None:
+        for done, source in enumerate(sources, start=1):
+            add(degrees.distance_counts(source))
+            if progress is not None:
+                progress(done, len(sources))
+        return histogram
+
+    with executor:
+        futures = [executor.submit(degrees.distance_counts, source)
+                   for source in sources]
+        for done, future in enumerate(as_completed(futures), start=1):
+            add(future.result())
+            if progress is not None:
+                progress(done, len(sources))
+    return histogram
+
+
+def report_progress(done, total):
+    """
+    Writes a progress line to stderr, ending it once all are done.
+    """
+    end = "\n" if done == total else ""
+    print(f"\r{done}/{total} sources", end=end, file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-d", "--directory", default="large")
+    parser.add_argument("-b", "--backend", default="compact",
+                        choices=["dict", *degrees.GRAPHS])
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    khop_parser = commands.add_parser("khop", help="count people within K degrees")
+    khop_parser.add_argument("name")
+    khop_parser.add_argument("k", type=int)
+    histogram_parser = commands.add_parser(
+        "histogram", help="sample the degree-of-separation distribution"
+    )
+    histogram_parser.add_argument("--samples", type=int, default=100,
+                                  help="number of sampled sources")
+    histogram_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, backend=args.backend)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.command == "khop":
+        person_id = degrees.person_id_for_name(args.name)
+        if person_id is None:
+            sys.exit(degrees.not_found(args.name))
+        counts = k_hop_counts(person_id, args.k)
+        total = 0
+        for distance, count in enumerate(counts[1:], start=1):
+            total += count
+            print(f"{distance}: {count} people ({total} within {distance})")
+        return
+
+    histogram = distance_histogram(
+        args.samples, args.directory, args.backend, args.workers, args.seed,
+        progress=report_progress
+    )
+    pairs = sum(histogram.values())
+    for distance in sorted(d for d in histogram if d is not None):
+        count = histogram[distance]
+        print(f"{distance}: {count} pairs ({count / pairs:.2%})")
+    print(f"not connected: {histogram[None]} pairs "
+          f"({histogram[None] / pairs:.2%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmarks for the degrees search and data structures.
+
+Usage: python benchmark.py search|backend|ingest [directory] [pairs]
+"""
+import csv
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+import ingest
+
+
+def count_expansions():
+    """
+    Wraps degrees.neighbors_for_person so that every expanded node is
+    counted. Returns a dictionary holding the running count.
+    """
+    counter = {"nodes": 0}
+    neighbors_for_person = degrees.neighbors_for_person
+
+    def counted(person_id):
+        counter["nodes"] += 1
+        return neighbors_for_person(person_id)
+
+    degrees.neighbors_for_person = counted
+    return counter
+
+
+def sample_pairs(count, seed=0):
+    """
+    Returns `count` random (source, target) pairs of person_ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(count)]
+
+
+def bench_search(pairs):
+    """
+    Compares one-sided BFS with bidirectional BFS on the same pairs.
+    """
+    counter = count_expansions()
+    searches = [
+        ("bfs", degrees.shortest_path),
+        ("bidirectional", degrees.shortest_path_bidirectional),
+    ]
+    lengths = {}
+    for name, search in searches:
+        counter["nodes"] = 0
+        start = time.perf_counter()
+        lengths[name] = [
+            None if path is None else len(path)
+            for path in (search(source, target) for source, target in pairs)
+        ]
+        elapsed = time.perf_counter() - start
+        print(f"{name:>14}: {counter['nodes']:>10} nodes expanded, "
+              f"{elapsed:8.3f}s for {len(pairs)} pairs")
+
+    if lengths["bfs"] != lengths["bidirectional"]:
+        sys.exit("Path lengths differ between searches.")
+
+
+def measure_backend(directory, backend, count):
+    """
+    Loads the data from CSV with the given backend and returns the time
+    taken, the memory retained, and the time taken by each search over
+    sampled pairs.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory, backend=backend, use_snapshot=False)
+    load_time = time.perf_counter() - start
+
+    # Load again under tracemalloc, which slows loading down
+    gc.collect()
+    tracemalloc.start()
+    degrees.load_data(directory, backend=backend, use_snapshot=False)
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    pairs = sample_pairs(count)
+    times = {}
+    for name, search in [("bfs", degrees.shortest_path),
+                         ("bidirectional", degrees.shortest_path_bidirectional)]:
+        start = time.perf_counter()
+        for source, target in pairs:
+            search(source, target)
+        times[name] = time.perf_counter() - start
+    return load_time, memory, times
+
+
+def bench_backend(directory, count):
+    """
+    Compares load time, memory and search time of each backend,
+    loading each one in a fresh process.
+    """
+    results = {}
+    for backend in ("dict", *degrees.GRAPHS):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[backend] = executor.submit(
+                measure_backend, directory, backend, count
+            ).result()
+        load_time, memory, times = results[backend]
+        print(f"{backend:>8}: load {load_time:7.2f}s, "
+              f"{memory / 2 ** 20:9.1f} MiB, "
+              f"bfs {times['bfs']:8.3f}s, "
+              f"bidirectional {times['bidirectional']:8.3f}s "
+              f"for {count} pairs")
+
+    _, dict_memory, dict_times = results["dict"]
+    for backend in degrees.GRAPHS:
+        _, memory, times = results[backend]
+        print(f"{backend:>8}: {dict_memory / memory:.1f}x less memory "
+              f"than dict, bfs {dict_times['bfs'] / times['bfs']:.1f}x "
+              f"faster, bidirectional "
+              f"{dict_times['bidirectional'] / times['bidirectional']:.1f}x "
+              f"faster")
+
+
+def bench_ingest(directory):
+    """
+    Compares rows/sec of csv.DictReader with the ingest module's
+    positional rows for each file.
+    """
+    for filename in ingest.FIELDS:
+        start = time.perf_counter()
+        with open(f"{directory}/{filename}", encoding="utf-8") as f:
+            count = sum(1 for _ in csv.DictReader(f))
+        dict_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if filename == "stars.csv":
+            count = sum(len(chunk) for chunk in ingest.star_chunks(directory))
+        else:
+            count = sum(1 for _ in ingest.rows(directory, filename))
+        tuple_time = time.perf_counter() - start
+
+        print(f"{filename:>11}: {count:>9} rows, "
+              f"DictReader {count / dict_time:>11,.0f} rows/sec, "
+              f"ingest {count / tuple_time:>11,.0f} rows/sec")
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ("search", "backend", "ingest"):
+        sys.exit("Usage: python benchmark.py search|backend|ingest "
+                 "[directory] [pairs]")
+    command = sys.argv[1]
+    directory = sys.argv[2] if len(sys.argv) > 2 else "large"
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    if command == "backend":
+        bench_backend(directory, count)
+        return
+    if command == "ingest":
+        bench_ingest(directory)
+        return
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    bench_search(sample_pairs(count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+LRU cache of breadth-first search trees for repeated degrees queries.
+
+Once a full search has been run from a source, the shortest path to any
+target is found by walking parent pointers back from the target, so
+queries from popular sources avoid searching again.
+"""
+import threading
+from collections import OrderedDict
+
+import degrees
+
+
+class PathCache():
+
+    def __init__(self, maxsize=16):
+        """
+        Create a cache holding search trees for at most maxsize sources.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.trees = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, as degrees.shortest_path.
+
+        If no possible path, returns None.
+        """
+        return self.tree(source).path_to(target)
+
+    def tree(self, source):
+        """
+        Returns the search tree for source, searching and caching it if
+        needed and evicting the least recently used tree when full.
+        """
+        with self.lock:
+            tree = self.trees.get(source)
+            if tree is not None:
+                self.hits += 1
+                self.trees.move_to_end(source)
+                return tree
+            self.misses += 1
+
+        # Search outside the lock so other sources are not held up
+        tree = degrees.search_tree(source)
+        with self.lock:
+            self.trees[source] = tree
+            self.trees.move_to_end(source)
+            while len(self.trees) > self.maxsize:
+                self.trees.popitem(last=False)
+        return tree
+
+    def clear(self):
+        """
+        Empty the cache and reset its counters.
+        """
+        with self.lock:
+            self.trees.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Returns a dictionary of hits, misses, current size and maxsize.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self.trees),
+            "maxsize": self.maxsize
+        }
@@ -1,7 +1,12 @@
-import csv
+import argparse
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import ingest
+import snapshot
+from graph import CompactGraph, CoStarGraph
+from nameindex import NameIndex
+from util import (Node, IndexedQueueFrontier, SearchTree,
+                  bidirectional_search, layer_sizes)
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,62 +17,108 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Graph classes for the backends other than "dict"
+GRAPHS = {
+    "compact": CompactGraph,
+    "costar": CoStarGraph
+}
 
-def load_data(directory):
+# Graph holding the data when loaded with one of the GRAPHS backends
+graph = None
+
+# Prefix and fuzzy index over the lowercase names in `names`
+name_index = None
+
+
+def load_data(directory, backend="dict", use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    The "dict" backend fills `names`, `people` and `movies` with nested
+    dictionaries. The "compact" backend loads a CompactGraph, and the
+    "costar" backend a CoStarGraph that also precomputes co-star edges.
+    Both are memory-mapped from a snapshot of the CSV files where one is
+    current (unless use_snapshot is False), and bind `names`, `people`
+    and `movies` to read-only views over the graph.
+
+    Either way, `name_index` is then made over the names, building its
+    fuzzy lookup postings only when first needed.
     """
+    global names, people, movies, graph, name_index
+    names, people, movies, graph, name_index = {}, {}, {}, None, None
+
+    if backend in GRAPHS:
+        if use_snapshot:
+            graph = snapshot.load_graph(directory, GRAPHS[backend])
+        else:
+            graph = GRAPHS[backend].from_csv(directory)
+        names = graph.names
+        people = graph.people
+        movies = graph.movies
+        name_index = NameIndex(graph.name_keys)
+        return
+    elif backend != "dict":
+        raise ValueError(f"unknown backend {backend}")
+
+    people_rows, movie_rows = ingest.read_people_and_movies(directory)
+
     # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+    for person_id, name, birth in people_rows:
+        people[person_id] = {
+            "name": name,
+            "birth": birth,
+            "movies": set()
+        }
+        if name.lower() not in names:
+            names[name.lower()] = {person_id}
+        else:
+            names[name.lower()].add(person_id)
 
     # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+    for movie_id, title, year in movie_rows:
+        movies[movie_id] = {
+            "title": title,
+            "year": year,
+            "stars": set()
+        }
 
     # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    for chunk in ingest.star_chunks(directory):
+        for person_id, movie_id in chunk:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                people[person_id]["movies"].add(movie_id)
+                movies[movie_id]["stars"].add(person_id)
             except KeyError:
                 pass
 
+    name_index = NameIndex(sorted(names))
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two people."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("-b", "--backend", default="compact",
+                        choices=["dict", *GRAPHS],
+                        help="graph backend; the graph backends load from "
+                             "a snapshot after the first run "
+                             "(default: compact)")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, backend=args.backend)
     print("Data loaded.")
 
-    source = person_id_for_name(input("Name: "))
+    name = input("Name: ")
+    source = person_id_for_name(name)
     if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
+        sys.exit(not_found(name))
+    name = input("Name: ")
+    target = person_id_for_name(name)
     if target is None:
-        sys.exit("Person not found.")
+        sys.exit(not_found(name))
 
     path = shortest_path(source, target)
 
@@ -91,10 +142,12 @@ def shortest_path(source, target):
 
     If no possible path, returns None.
     """
+    if graph is not None:
+        return graph.shortest_path(source, target)
 
     # TODO
     # Initialize the frontier
-    frontier = QueueFrontier()
+    frontier = IndexedQueueFrontier()
     # Add the starting node (source person) to the frontier
     frontier.add(Node(state=source, parent=None, action=None))
 
@@ -125,15 +178,54 @@ def shortest_path(source, target):
     return None
 
 
-def person_id_for_name(name):
+def shortest_path_bidirectional(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outwards
+    from both ends at once and always growing the smaller side.
+
+    If no possible path, returns None.
+    """
+    if graph is not None:
+        return graph.shortest_path_bidirectional(source, target)
+    return bidirectional_search(source, target, neighbors_for_person)
+
+
+def search_tree(source):
+    """
+    Returns the parent pointers of a full breadth-first search from
+    source, whose path_to(target) method returns the shortest list of
+    (movie_id, person_id) pairs that connect source to target.
+    """
+    if graph is not None:
+        return graph.search_tree(source)
+    return SearchTree(source, neighbors_for_person)
+
+
+def distance_counts(source, max_depth=None):
+    """
+    Returns a list whose item d is the number of people exactly d
+    degrees of separation from source, up to max_depth if given.
+    """
+    if graph is not None:
+        return layer_sizes(graph.person(source), graph.neighbors, max_depth)
+    return layer_sizes(source, neighbors_for_person, max_depth)
+
+
+def person_id_for_name(name, interactive=True):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If interactive is False, ambiguous names return None
+    rather than prompting for the intended person.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if not interactive:
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -151,11 +243,56 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_ids_for_prefix(prefix, limit=10):
+    """
+    Returns up to limit person_ids whose names start with prefix,
+    in order of name.
+    """
+    return _person_ids_for_names(name_index.prefix(prefix, limit), limit)
+
+
+def person_ids_for_fuzzy_name(name, limit=10):
+    """
+    Returns up to limit person_ids whose names are most similar
+    to name, best match first.
+    """
+    return _person_ids_for_names(name_index.fuzzy(name, limit), limit)
+
+
+def _person_ids_for_names(keys, limit):
+    """
+    Returns up to limit person_ids for a list of lowercase names.
+    """
+    person_ids = []
+    for key in keys:
+        person_ids.extend(sorted(names[key]))
+    return person_ids[:limit]
+
+
+def not_found(name):
+    """
+    Returns the message for a name that did not match one person,
+    suggesting similar names if it matched nobody.
+    """
+    if name.lower() in names:
+        return "Person not found."
+    # People sharing a name are suggested once, best match first
+    suggestions = list(dict.fromkeys(
+        people[person_id]["name"]
+        for person_id in person_ids_for_fuzzy_name(name, limit=5)
+    ))
+    if not suggestions:
+        return "Person not found."
+    return f"Person not found. Did you mean: {', '.join(suggestions)}?"
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,479 @@
+"""
+Compact graph store for degrees.
+
+Person and movie IDs are interned to dense integers, and the star
+relation is kept in CSR form: for person p, the indices of their
+movies are person_movies[person_offsets[p]:person_offsets[p + 1]],
+and likewise movie_stars/movie_offsets for the cast of each movie.
+
+People and movies are numbered in sorted ID order, so an ID is mapped
+to its index by bisection rather than through a dictionary. Lowercase
+names are likewise kept sorted, with name_people listing the people
+who share each name.
+
+CoStarGraph adds a precomputed, deduplicated person-to-person adjacency,
+recording one movie that witnesses each co-star edge.
+"""
+from array import array
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Mapping
+
+import ingest
+from util import bidirectional_search
+
+# Typecode for index arrays (32-bit signed integers)
+INDEX = "i"
+
+
+def find(keys, key):
+    """
+    Returns the index of key in the sorted sequence keys,
+    raising KeyError if it is not there.
+    """
+    i = bisect_left(keys, key)
+    if i == len(keys) or keys[i] != key:
+        raise KeyError(key)
+    return i
+
+
+class Records(Mapping):
+    """
+    Read-only mapping from sorted IDs to dictionaries of fields,
+    built on demand from columns so that no per-record dict is stored.
+    """
+
+    def __init__(self, ids, columns, related):
+        self.ids = ids
+        self.columns = columns
+        self.related = related
+
+    def __getitem__(self, key):
+        i = find(self.ids, key)
+        record = {field: column[i] for field, column in self.columns.items()}
+        for field, related in self.related.items():
+            record[field] = related(i)
+        return record
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class Names(Mapping):
+    """
+    Read-only mapping from lowercase names to sets of person_ids.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        i = find(graph.name_keys, name)
+        start, end = graph.name_offsets[i], graph.name_offsets[i + 1]
+        return {graph.person_ids[p] for p in graph.name_people[start:end]}
+
+    def __iter__(self):
+        return iter(self.graph.name_keys)
+
+    def __len__(self):
+        return len(self.graph.name_keys)
+
+
+class CompactSearchTree():
+    """
+    Parent pointers from a full breadth-first search of a CompactGraph,
+    kept as arrays indexed by person: the movie and person one step
+    back towards the source, or -1 where no person was reached.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.source = graph.person(source)
+        size = len(graph.person_ids)
+        self.movies = array(INDEX, [-1]) * size
+        self.parents = array(INDEX, [-1]) * size
+
+        neighbors = graph.neighbors
+        movies, parents = self.movies, self.parents
+        parents[self.source] = self.source
+        queue = deque([self.source])
+        while queue:
+            p = queue.popleft()
+            for m, q in neighbors(p):
+                if parents[q] == -1:
+                    parents[q] = p
+                    movies[q] = m
+                    queue.append(q)
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the source to target, or None if it was not reached.
+        """
+        graph = self.graph
+        p = graph.person(target)
+        if self.parents[p] == -1:
+            return None
+        path = []
+        while p != self.source:
+            path.append((graph.movie_ids[self.movies[p]], graph.person_ids[p]))
+            p = self.parents[p]
+        path.reverse()
+        return path
+
+
+class CompactGraph():
+
+    # Name of the snapshot file caching this kind of graph
+    SNAPSHOT = "degrees.snapshot"
+
+    # Sequences of strings, and index arrays, that make up a graph
+    TABLES = ("person_ids", "person_names", "person_births",
+              "movie_ids", "movie_titles", "movie_years", "name_keys")
+    ARRAYS = ("person_offsets", "person_movies",
+              "movie_offsets", "movie_stars",
+              "name_offsets", "name_people")
+
+    def __init__(self, person_ids, person_names, person_births,
+                 movie_ids, movie_titles, movie_years, name_keys,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 name_offsets, name_people):
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.movie_ids = movie_ids
+        self.movie_titles = movie_titles
+        self.movie_years = movie_years
+        self.name_keys = name_keys
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+        self.name_offsets = name_offsets
+        self.name_people = name_people
+
+        self.names = Names(self)
+        self.people = Records(
+            person_ids,
+            {"name": person_names, "birth": person_births},
+            {"movies": self._movie_ids_for}
+        )
+        self.movies = Records(
+            movie_ids,
+            {"title": movie_titles, "year": movie_years},
+            {"stars": self._person_ids_for}
+        )
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load a graph from the people, movies and stars CSV files.
+        """
+        people, movies = ingest.read_people_and_movies(directory)
+        people.sort()
+        movies.sort()
+        person_ids, person_names, person_births = columns(people, 3)
+        movie_ids, movie_titles, movie_years = columns(movies, 3)
+        del people, movies
+
+        person_index = {id: i for i, id in enumerate(person_ids)}
+        movie_index = {id: i for i, id in enumerate(movie_ids)}
+
+        # Collect star edges as parallel index arrays, skipping
+        # edges to unknown people or movies
+        edge_people = array(INDEX)
+        edge_movies = array(INDEX)
+        for chunk in ingest.star_chunks(directory):
+            for person_id, movie_id in chunk:
+                p = person_index.get(person_id)
+                m = movie_index.get(movie_id)
+                if p is not None and m is not None:
+                    edge_people.append(p)
+                    edge_movies.append(m)
+
+        return cls.from_edges(
+            person_ids, person_names, person_births,
+            movie_ids, movie_titles, movie_years,
+            edge_people, edge_movies
+        )
+
+    @classmethod
+    def from_edges(cls, person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years,
+                   edge_people, edge_movies):
+        """
+        Build a graph from ID-sorted columns and star edges
+        given as parallel arrays of person and movie indices.
+        """
+        person_offsets, person_movies = build_csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_stars = build_csr(
+            len(movie_ids), edge_movies, edge_people
+        )
+
+        # Group people by lowercase name, in sorted name order
+        by_name = sorted(
+            (name.lower(), p) for p, name in enumerate(person_names)
+        )
+        name_keys = sorted({name for name, _ in by_name})
+        key_index = {name: i for i, name in enumerate(name_keys)}
+        name_offsets, name_people = build_csr(
+            len(name_keys),
+            array(INDEX, (key_index[name] for name, _ in by_name)),
+            array(INDEX, (p for _, p in by_name))
+        )
+
+        return cls(person_ids, person_names, person_births,
+                   movie_ids, movie_titles, movie_years, name_keys,
+                   person_offsets, person_movies, movie_offsets, movie_stars,
+                   name_offsets, name_people)
+
+    def consistent(self):
+        """
+        Returns True if the lengths of the graph's columns and index
+        arrays agree with each other, as they do in any graph built
+        from CSV files.
+        """
+        people, movies = len(self.person_ids), len(self.movie_ids)
+        return (len(self.person_names) == len(self.person_births) == people
+                and len(self.movie_titles) == len(self.movie_years) == movies
+                and len(self.person_offsets) == people + 1
+                and len(self.movie_offsets) == movies + 1
+                and len(self.name_offsets) == len(self.name_keys) + 1
+                and self.person_offsets[-1] == len(self.person_movies)
+                and self.movie_offsets[-1] == len(self.movie_stars)
+                and self.name_offsets[-1] == len(self.name_people)
+                and len(self.person_movies) == len(self.movie_stars)
+                and len(self.name_people) == people)
+
+    def person(self, person_id):
+        """
+        Returns the index of a person_id, raising KeyError if unknown.
+        """
+        return find(self.person_ids, person_id)
+
+    def neighbors(self, p):
+        """
+        Yields (movie, person) index pairs for people
+        who starred with the person at index p.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+        for k in range(person_offsets[p], person_offsets[p + 1]):
+            m = person_movies[k]
+            for q in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                yield m, q
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        movie_ids, person_ids = self.movie_ids, self.person_ids
+        return {(movie_ids[m], person_ids[q])
+                for m, q in self.neighbors(self.person(person_id))}
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        s = self.person(source)
+        t = self.person(target)
+        if s == t:
+            return []
+
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        # Map each reached person to the (movie, person) step leading back
+        parents = {s: None}
+        queue = deque([s])
+        while queue:
+            p = queue.popleft()
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                for q in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                    if q in parents:
+                        continue
+                    parents[q] = (m, p)
+                    if q == t:
+                        return self._path_to(parents, t)
+                    queue.append(q)
+        return None
+
+    def shortest_path_bidirectional(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, searching from both ends.
+
+        If no possible path, returns None.
+        """
+        path = bidirectional_search(
+            self.person(source), self.person(target), self.neighbors
+        )
+        if path is None:
+            return None
+        return [(self.movie_ids[m], self.person_ids[q]) for m, q in path]
+
+    def search_tree(self, source):
+        """
+        Returns the CompactSearchTree of a full search from source.
+        """
+        return CompactSearchTree(self, source)
+
+    def _path_to(self, parents, p):
+        """
+        Returns the (movie_id, person_id) path from the root of
+        parents to the person at index p.
+        """
+        path = []
+        while parents[p] is not None:
+            m, parent = parents[p]
+            path.append((self.movie_ids[m], self.person_ids[p]))
+            p = parent
+        path.reverse()
+        return path
+
+    def _movie_ids_for(self, p):
+        start, end = self.person_offsets[p], self.person_offsets[p + 1]
+        return {self.movie_ids[m] for m in self.person_movies[start:end]}
+
+    def _person_ids_for(self, m):
+        start, end = self.movie_offsets[m], self.movie_offsets[m + 1]
+        return {self.person_ids[p] for p in self.movie_stars[start:end]}
+
+
+class CoStarGraph(CompactGraph):
+    """
+    CompactGraph with a precomputed co-star adjacency: the co-stars of
+    person p are costar_people[costar_offsets[p]:costar_offsets[p + 1]],
+    each listed once, with a movie they shared at the same position in
+    costar_movies. Searches then visit each co-star edge only once,
+    at the cost of storing the edges.
+    """
+
+    SNAPSHOT = "costars.snapshot"
+    ARRAYS = CompactGraph.ARRAYS + (
+        "costar_offsets", "costar_people", "costar_movies"
+    )
+
+    def __init__(self, costar_offsets, costar_people, costar_movies,
+                 **fields):
+        super().__init__(**fields)
+        self.costar_offsets = costar_offsets
+        self.costar_people = costar_people
+        self.costar_movies = costar_movies
+
+    def consistent(self):
+        """
+        Returns True if the co-star arrays also agree with the graph.
+        """
+        return (super().consistent()
+                and len(self.costar_offsets) == len(self.person_ids) + 1
+                and self.costar_offsets[-1] == len(self.costar_people)
+                and len(self.costar_people) == len(self.costar_movies))
+
+    @classmethod
+    def from_edges(cls, *args):
+        """
+        Build a graph from ID-sorted columns and star edges
+        given as parallel arrays of person and movie indices,
+        then derive the co-star adjacency from its movie casts.
+        """
+        graph = CompactGraph.from_edges(*args)
+        fields = {name: getattr(graph, name)
+                  for name in CompactGraph.TABLES + CompactGraph.ARRAYS}
+
+        person_offsets, person_movies = graph.person_offsets, graph.person_movies
+        movie_offsets, movie_stars = graph.movie_offsets, graph.movie_stars
+        costar_offsets = array(INDEX, [0])
+        costar_people = array(INDEX)
+        costar_movies = array(INDEX)
+        for p in range(len(graph.person_ids)):
+
+            # Keep the first movie found for each co-star
+            witnesses = {}
+            for k in range(person_offsets[p], person_offsets[p + 1]):
+                m = person_movies[k]
+                for q in movie_stars[movie_offsets[m]:movie_offsets[m + 1]]:
+                    if q != p and q not in witnesses:
+                        witnesses[q] = m
+            costar_people.extend(witnesses.keys())
+            costar_movies.extend(witnesses.values())
+            costar_offsets.append(len(costar_people))
+
+        return cls(costar_offsets, costar_people, costar_movies, **fields)
+
+    def neighbors(self, p):
+        """
+        Yields a (movie, person) index pair for each
+        co-star of the person at index p.
+        """
+        start, end = self.costar_offsets[p], self.costar_offsets[p + 1]
+        return zip(self.costar_movies[start:end], self.costar_people[start:end])
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+        """
+        s = self.person(source)
+        t = self.person(target)
+        if s == t:
+            return []
+
+        costar_offsets = self.costar_offsets
+        costar_people, costar_movies = self.costar_people, self.costar_movies
+
+        # Map each reached person to the (movie, person) step leading back
+        parents = {s: None}
+        queue = deque([s])
+        while queue:
+            p = queue.popleft()
+            for k in range(costar_offsets[p], costar_offsets[p + 1]):
+                q = costar_people[k]
+                if q in parents:
+                    continue
+                parents[q] = (costar_movies[k], p)
+                if q == t:
+                    return self._path_to(parents, t)
+                queue.append(q)
+        return None
+
+
+def columns(rows, width):
+    """
+    Returns a list of `width` column lists from a list of row tuples.
+    """
+    if not rows:
+        return [[] for _ in range(width)]
+    return [list(column) for column in zip(*rows)]
+
+
+def build_csr(size, sources, targets):
+    """
+    Returns (offsets, indices) arrays grouping targets by source,
+    for sources numbered 0 to size - 1.
+    """
+    offsets = array(INDEX, bytes(array(INDEX).itemsize * (size + 1)))
+    for s in sources:
+        offsets[s + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    indices = array(INDEX, bytes(array(INDEX).itemsize * len(targets)))
+    position = offsets[:-1]
+    for s, t in zip(sources, targets):
+        indices[position[s]] = t
+        position[s] += 1
+    return offsets, indices
@@ -0,0 +1,128 @@
+"""
+Prefix and fuzzy lookup of lowercase names for degrees.
+
+Prefix matches are found by bisection into the sorted names. Fuzzy
+matches are found through a trigram index, built on the first fuzzy
+lookup so that loading the names stays cheap: candidates are gathered
+from the postings of the query's trigrams, rarest first, the ones
+sharing most of those trigrams are kept, and these are ranked by the
+Dice coefficient of their trigrams and the query's, dropping those too
+dissimilar to count as a match.
+
+Postings are ordered by name length, and a posting too long to read
+whole within the budget is read only around the query's length, where
+the names with the best Dice coefficients are.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Typecode for posting lists of name indices (32-bit signed integers)
+INDEX = "i"
+
+# Most postings read when gathering fuzzy match candidates
+POSTINGS_BUDGET = 2048
+
+# Candidates kept for exact ranking, per fuzzy match requested
+CANDIDATES_PER_MATCH = 4
+
+# Least Dice coefficient for a name to count as a fuzzy match
+MIN_SCORE = 0.5
+
+
+def trigrams(name):
+    """
+    Returns the set of trigrams of a lowercase name, padded so that
+    its first and last letters also start and end trigrams.
+    """
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex():
+
+    def __init__(self, keys):
+        """
+        Create an index over keys, a sorted sequence of lowercase names.
+        """
+        self.keys = keys
+
+        # Trigram postings, built on the first fuzzy lookup
+        self.postings = None
+
+    def build(self):
+        """
+        Builds the postings of every trigram: the indices of the keys
+        holding it, shortest key first.
+        """
+        keys = self.keys
+        postings = {}
+        for i in sorted(range(len(keys)), key=lambda i: len(keys[i])):
+            for trigram in trigrams(keys[i]):
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array(INDEX)
+                posting.append(i)
+        self.postings = postings
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to limit names that start with prefix, in sorted order.
+        """
+        prefix = prefix.lower()
+        keys = self.keys
+        matches = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and len(matches) < limit:
+            key = keys[i]
+            if not key.startswith(prefix):
+                break
+            matches.append(key)
+            i += 1
+        return matches
+
+    def fuzzy(self, name, limit=10, min_score=MIN_SCORE):
+        """
+        Returns up to limit names most similar to name, best match
+        first, leaving out names scoring below min_score.
+        """
+        if self.postings is None:
+            self.build()
+        name = name.lower()
+        query = trigrams(name)
+
+        # Gather candidates from the rarest trigrams first, sharing the
+        # budget left among the rest, so that very common trigrams do
+        # not blow up the candidate set
+        postings = sorted(
+            (self.postings[trigram] for trigram in query
+             if trigram in self.postings),
+            key=len
+        )
+        counts = Counter()
+        budget = POSTINGS_BUDGET
+        keys = self.keys
+        for remaining, posting in zip(range(len(postings), 0, -1), postings):
+            share = budget // remaining
+            if len(posting) > share:
+                # Read the names nearest the query's length
+                middle = bisect_left(posting, len(name),
+                                     key=lambda i: len(keys[i]))
+                start = max(0, min(middle - share // 2, len(posting) - share))
+                posting = posting[start:start + share]
+            counts.update(posting)
+            budget -= len(posting)
+        candidates = heapq.nlargest(
+            limit * CANDIDATES_PER_MATCH, counts, key=counts.__getitem__
+        )
+
+        scored = []
+        for i in candidates:
+            key = self.keys[i]
+            shared = trigrams(key)
+            score = 2 * len(query & shared) / (len(query) + len(shared))
+            if score >= min_score:
+                scored.append((-score, key))
+        scored.sort()
+        return [key for _, key in scored[:limit]]
@@ -0,0 +1,285 @@
+"""
+Batch and server modes for answering many degrees queries
+against a graph that is loaded once.
+
+Queries are lines holding a source and a target name separated by a
+tab. Each answer is written as one line of JSON, in query order:
+
+    {"source": "Kevin Bacon", "target": "Tom Hanks", "degrees": 1,
+     "path": [["112384", "158"]]}
+
+or, if the query cannot be answered:
+
+    {"source": "Kevin Bacon", "target": "Nobody", "error": "..."}
+
+Usage:
+    python service.py batch [-d directory] [file]
+    python service.py serve [-d directory] [--port port]
+
+With --cache-size, each process keeps a PathCache of search trees for
+its most recent sources.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socketserver
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import degrees
+from cache import PathCache
+
+# Number of queries handed to the pool at a time in batch mode
+CHUNK_SIZE = 1024
+
+# This process's cache of search trees, if enabled
+path_cache = None
+
+# Cache hits and misses reported back by the pool's workers
+worker_cache = {"hits": 0, "misses": 0}
+
+
+def load(directory, backend, cache_size=0):
+    """
+    Loads the data into this process, unless it already holds it.
+    Used as the pool initializer, so that forked workers share the
+    parent's read-only graph and spawned workers load their own.
+    """
+    global path_cache
+    if degrees.graph is None and not degrees.people:
+        degrees.load_data(directory, backend=backend)
+    path_cache = PathCache(cache_size) if cache_size else None
+
+
+def resolve(name):
+    """
+    Returns (person_id, error) for a name, without prompting.
+    """
+    person_id = degrees.person_id_for_name(name, interactive=False)
+    if person_id is not None:
+        return person_id, None
+    if len(degrees.names.get(name.lower(), set())) > 1:
+        return None, f"ambiguous name '{name}'"
+    return None, f"person '{name}' not found"
+
+
+def answer(query):
+    """
+    Returns the JSON-ready answer to a (source, target) query of names.
+    """
+    source_name, target_name = query
+    response = {"source": source_name, "target": target_name}
+
+    source, error = resolve(source_name)
+    if source is None:
+        response["error"] = error
+        return response
+    target, error = resolve(target_name)
+    if target is None:
+        response["error"] = error
+        return response
+
+    if path_cache is not None:
+        path = path_cache.shortest_path(source, target)
+    else:
+        path = degrees.shortest_path(source, target)
+    if path is None:
+        response["error"] = "not connected"
+    else:
+        response["degrees"] = len(path)
+        response["path"] = [list(step) for step in path]
+    return response
+
+
+def counted_answer(query):
+    """
+    Returns (answer, hits, misses) for a query, with the cache hits and
+    misses answering it took, so that workers report their cache use.
+    """
+    if path_cache is None:
+        return answer(query), 0, 0
+    hits, misses = path_cache.hits, path_cache.misses
+    response = answer(query)
+    return response, path_cache.hits - hits, path_cache.misses - misses
+
+
+def pooled_answers(executor, queries):
+    """
+    Yields the answers to queries from the pool, in order, adding the
+    workers' cache hits and misses to worker_cache.
+    """
+    results = executor.map(
+        counted_answer, queries, chunksize=max(1, len(queries) // 64)
+    )
+    for response, hits, misses in results:
+        worker_cache["hits"] += hits
+        worker_cache["misses"] += misses
+        yield response
+
+
+def parse(line):
+    """
+    Returns the (source, target) query on a line, or None if the line is
+    blank. Raises ValueError if the line does not hold two names.
+    """
+    line = line.rstrip("\r\n")
+    if not line.strip():
+        return None
+    fields = line.split("\t")
+    if len(fields) != 2:
+        raise ValueError(f"expected 'source<TAB>target', got {line!r}")
+    return fields[0].strip(), fields[1].strip()
+
+
+def respond(lines, executor, chunk_size):
+    """
+    Yields the JSON answer to each query line, in order.
+    """
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+
+        # Malformed lines are answered directly, the rest by the pool
+        queries = []
+        for line in chunk:
+            try:
+                query = parse(line)
+            except ValueError as e:
+                queries.append({"error": str(e)})
+            else:
+                if query is not None:
+                    queries.append(query)
+        valid = [query for query in queries if isinstance(query, tuple)]
+        if executor is None:
+            answers = iter([answer(query) for query in valid])
+        else:
+            answers = pooled_answers(executor, valid)
+        for query in queries:
+            response = next(answers) if isinstance(query, tuple) else query
+            yield json.dumps(response)
+
+
+def make_executor(workers, directory, backend, cache_size=0):
+    """
+    Returns a process pool over the loaded graph, or None for one worker.
+    """
+    if workers == 1:
+        return None
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context(
+        "fork" if "fork" in methods else None
+    )
+    executor = ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=load, initargs=(directory, backend, cache_size)
+    )
+
+    # Start every worker now, from this thread, rather than on the first
+    # query: forking once server threads are running would copy any lock
+    # they hold, such as a PathCache's or stdout's, into the children
+    for future in [executor.submit(os.getpid) for _ in range(workers)]:
+        future.result()
+    return executor
+
+
+def batch(args):
+    """
+    Answers every query in a file, or stdin, and writes them to stdout.
+    """
+    executor = make_executor(
+        args.workers, args.directory, args.backend, args.cache_size
+    )
+    try:
+        if args.file is None:
+            lines = sys.stdin
+        else:
+            lines = open(args.file, encoding="utf-8")
+        with lines:
+            for response in respond(lines, executor, CHUNK_SIZE):
+                print(response)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if executor is not None and args.cache_size:
+        # The parent's cache is unused; sum what the workers reported
+        stats = {**worker_cache, "workers": args.workers,
+                 "maxsize": args.cache_size}
+        print(f"Cache: {stats}", file=sys.stderr)
+    elif path_cache is not None:
+        print(f"Cache: {path_cache.stats()}", file=sys.stderr)
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """
+    Answers query lines on a connection until the client closes it.
+    """
+
+    def handle(self):
+        lines = (str(line, "utf-8") for line in self.rfile)
+        for response in respond(lines, self.server.executor, 1):
+            self.wfile.write(response.encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class QueryServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def serve(args):
+    """
+    Keeps the graph loaded and answers queries from stdin, one at a
+    time, or from any number of clients on a local TCP port.
+    """
+    executor = make_executor(
+        args.workers, args.directory, args.backend, args.cache_size
+    )
+    try:
+        if args.port is None:
+            for response in respond(sys.stdin, executor, 1):
+                print(response, flush=True)
+            return
+        with QueryServer(("127.0.0.1", args.port), QueryHandler) as server:
+            server.executor = executor
+            print(f"Serving on port {server.server_address[1]}.",
+                  file=sys.stderr, flush=True)
+            server.serve_forever()
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-d", "--directory", default="large")
+    parser.add_argument("-b", "--backend", default="compact",
+                        choices=["dict", *degrees.GRAPHS])
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of worker processes")
+    parser.add_argument("-c", "--cache-size", type=int, default=0,
+                        help="search trees cached per process (default: 0)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch_parser = commands.add_parser("batch", help="answer a file of queries")
+    batch_parser.add_argument("file", nargs="?",
+                              help="file of queries (default: stdin)")
+    serve_parser = commands.add_parser("serve", help="answer queries until stopped")
+    serve_parser.add_argument("--port", type=int,
+                              help="local TCP port (default: use stdin)")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    load(args.directory, args.backend, args.cache_size)
+    print("Data loaded.", file=sys.stderr)
+
+    if args.command == "batch":
+        batch(args)
+    else:
+        serve(args)
+
+
+if __name__ == "__main__":
+    main()
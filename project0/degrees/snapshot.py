@@ -0,0 +1,180 @@
+"""
+Binary snapshot cache for the compact degrees graph.
+
+A snapshot is written next to the CSV files the first time a directory
+is loaded, and memory-mapped on later runs so that no CSV parsing is
+needed. It records the size and modification time of each source CSV,
+and is rebuilt whenever any of them change.
+
+Layout: an 8-byte magic string, an 8-byte header length, a JSON header,
+then each section aligned to 8 bytes. Section offsets in the header are
+relative to the end of the header, rounded up to 8 bytes, and so is the
+recorded end of the file, so that a truncated snapshot is detected.
+Index arrays are stored raw, and each table of strings as one UTF-8
+blob plus an array of end offsets.
+"""
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Sequence
+
+from graph import CompactGraph
+
+MAGIC = b"DEGSNAP1"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+# Typecode for string table offsets (64-bit signed integers)
+OFFSET = "q"
+
+
+class StringTable(Sequence):
+    """
+    Read-only sequence of strings decoded on demand from a UTF-8 blob.
+    """
+
+    def __init__(self, blob, ends):
+        self.blob = blob
+        self.ends = ends
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        start = self.ends[i - 1] if i else 0
+        return str(self.blob[start:self.ends[i]], "utf-8")
+
+    def __len__(self):
+        return len(self.ends)
+
+
+def source_stats(directory):
+    """
+    Returns the [size, mtime_ns] of each source CSV in directory.
+    """
+    stats = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stats[name] = [stat.st_size, stat.st_mtime_ns]
+    return stats
+
+
+def load_graph(directory, cls=CompactGraph):
+    """
+    Returns the graph of class cls for directory, read from its snapshot
+    if that is current, and otherwise loaded from the CSV files and
+    written to a new snapshot.
+    """
+    graph = load(directory, cls)
+    if graph is None:
+        graph = cls.from_csv(directory)
+        try:
+            save(directory, graph)
+        except OSError:
+            # A read-only directory only costs us the cache
+            pass
+    return graph
+
+
+def load(directory, cls=CompactGraph):
+    """
+    Returns the graph of class cls memory-mapped from directory's
+    snapshot, or None if there is no snapshot or it is out of date
+    or damaged.
+    """
+    path = os.path.join(directory, cls.SNAPSHOT)
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    view = memoryview(data)
+    try:
+        if bytes(view[:8]) != MAGIC:
+            return None
+        length = int.from_bytes(view[8:16], "little")
+        header = json.loads(bytes(view[16:16 + length]))
+        if header["sources"] != source_stats(directory):
+            return None
+        base = align(16 + length)
+        if base + header["end"] != len(data):
+            return None
+    except (ValueError, KeyError, OSError):
+        return None
+
+    def section(name):
+        offset, size, typecode = header["sections"][name]
+        if base + offset + size > len(data):
+            raise ValueError(f"section {name} runs past the end of the file")
+        values = view[base + offset:base + offset + size].cast(typecode)
+        if len(values) * values.itemsize != size:
+            raise ValueError(f"section {name} is cut short")
+        return values
+
+    fields = {}
+    try:
+        for name in cls.TABLES:
+            fields[name] = StringTable(section(name), section(name + ".ends"))
+        for name in cls.ARRAYS:
+            fields[name] = section(name)
+    except (KeyError, TypeError, ValueError):
+        # A missing or malformed section means the snapshot is rebuilt
+        return None
+    graph = cls(**fields)
+    if not graph.consistent():
+        return None
+    return graph
+
+
+def save(directory, graph):
+    """
+    Writes a snapshot of graph, built from directory's CSV files.
+    """
+    sections = {}
+    for name in graph.TABLES:
+        blob = bytearray()
+        ends = array(OFFSET)
+        for s in getattr(graph, name):
+            blob += s.encode("utf-8")
+            ends.append(len(blob))
+        sections[name] = (blob, "B")
+        sections[name + ".ends"] = (ends, OFFSET)
+    for name in graph.ARRAYS:
+        values = getattr(graph, name)
+        sections[name] = (values, values.typecode)
+
+    # Lay sections out after the header, aligned to 8 bytes
+    header = {"sources": source_stats(directory), "sections": {}}
+    layout = []
+    offset = 0
+    for name, (data, typecode) in sections.items():
+        data = memoryview(data).cast("B")
+        layout.append((offset, data))
+        header["sections"][name] = [offset, len(data), typecode]
+        header["end"] = offset + len(data)
+        offset = align(offset + len(data))
+
+    encoded = json.dumps(header).encode("utf-8")
+    base = align(16 + len(encoded))
+
+    # Write to a temporary file so readers never see a partial snapshot
+    path = os.path.join(directory, graph.SNAPSHOT)
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(encoded).to_bytes(8, "little"))
+        f.write(encoded)
+        for offset, data in layout:
+            f.seek(base + offset)
+            f.write(data)
+        f.truncate(base + header["end"])
+    os.replace(temporary, path)
+
+
+def align(offset):
+    """
+    Returns offset rounded up to a multiple of 8.
+    """
+    return (offset + 7) & ~7
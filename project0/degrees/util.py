@@ -1,3 +1,6 @@
+from collections import deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,170 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class IndexedStackFrontier():
+    """
+    Stack frontier backed by a deque, with a count of the nodes held
+    for each state so that add, remove and contains_state are O(1).
+    """
+
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self._forget(self.frontier.pop())
+
+    def _forget(self, node):
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+        return node
+
+
+class IndexedQueueFrontier(IndexedStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self._forget(self.frontier.popleft())
+
+
+def bidirectional_search(source, target, neighbors):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    source to target, where neighbors(state) yields (action, state)
+    pairs for a symmetric graph. Expands whole layers outwards from
+    both ends, always growing the smaller side.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Map each reached state to the (action, state) step
+    # that leads back towards the side's starting state
+    forward = {source: None}
+    backward = {target: None}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+
+        # Expand a whole layer of whichever side is currently smaller
+        if len(forward_layer) <= len(backward_layer):
+            layer, reached, other = forward_layer, forward, backward
+        else:
+            layer, reached, other = backward_layer, backward, forward
+
+        next_layer = []
+        for state in layer:
+            for action, neighbor in neighbors(state):
+                if neighbor in reached:
+                    continue
+                reached[neighbor] = (action, state)
+                if neighbor in other:
+                    return _join_paths(forward, backward, neighbor)
+                next_layer.append(neighbor)
+
+        if reached is forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return None
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Returns the (action, state) path through the state
+    where the forward and backward searches met.
+    """
+    # Walk from the meeting point back to the source
+    path = []
+    state = meeting
+    while forward[state] is not None:
+        action, parent = forward[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+
+    # Walk from the meeting point on to the target
+    state = meeting
+    while backward[state] is not None:
+        action, child = backward[state]
+        path.append((action, child))
+        state = child
+    return path
+
+
+class SearchTree():
+    """
+    Parent pointers from a full breadth-first search out of source,
+    where neighbors(state) yields (action, state) pairs.
+    """
+
+    def __init__(self, source, neighbors):
+        self.source = source
+        self.parents = {source: None}
+        frontier = deque([source])
+        while frontier:
+            state = frontier.popleft()
+            for action, neighbor in neighbors(state):
+                if neighbor not in self.parents:
+                    self.parents[neighbor] = (action, state)
+                    frontier.append(neighbor)
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (action, state) pairs that
+        connect the source to target, or None if it was not reached.
+        """
+        if target not in self.parents:
+            return None
+        path = []
+        while self.parents[target] is not None:
+            action, parent = self.parents[target]
+            path.append((action, target))
+            target = parent
+        path.reverse()
+        return path
+
+
+def layer_sizes(source, neighbors, max_depth=None):
+    """
+    Returns a list whose item d is the number of states at distance d
+    from source, found by one breadth-first sweep that stops after
+    max_depth layers if given.
+    """
+    sizes = [1]
+    reached = {source}
+    layer = [source]
+    while layer and (max_depth is None or len(sizes) <= max_depth):
+        next_layer = []
+        for state in layer:
+            for _, neighbor in neighbors(state):
+                if neighbor not in reached:
+                    reached.add(neighbor)
+                    next_layer.append(neighbor)
+        if next_layer:
+            sizes.append(len(next_layer))
+        layer = next_layer
+    return sizes
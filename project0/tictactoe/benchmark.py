@@ -0,0 +1,158 @@
+"""
+Benchmarks for the tic-tac-toe AI.
+
+Usage: python benchmark.py [game|positions|parallel]
+"""
+import math
+import os
+import sys
+import time
+from collections import defaultdict
+
+import tictactoe as ttt
+
+
+def play_game():
+    """
+    Plays one AI-vs-AI game from the empty board, printing the nodes
+    searched and the latency of each move.
+    """
+    board = ttt.initial_state()
+    move = 1
+    while not ttt.terminal(board):
+        ttt.stats["nodes"] = ttt.stats["hits"] = 0
+        start = time.perf_counter()
+        action = ttt.minimax(board, use_book=False)
+        elapsed = time.perf_counter() - start
+        print(f"  move {move}: {ttt.player(board)} plays {action}, "
+              f"{ttt.stats['nodes']:>6} nodes, {ttt.stats['hits']:>6} hits, "
+              f"{elapsed * 1000:9.3f}ms")
+        board = ttt.result(board, action)
+        move += 1
+
+
+def reachable_positions():
+    """
+    Returns a list of every board reachable from the empty board.
+    """
+    positions = {}
+    frontier = [ttt.initial_state()]
+    while frontier:
+        board = frontier.pop()
+        key = ttt.encode(board)
+        if key in positions:
+            continue
+        positions[key] = board
+        if not ttt.terminal(board):
+            frontier.extend(ttt.result(board, action)
+                            for action in ttt.actions(board))
+    return list(positions.values())
+
+
+def tree_size(board, sizes):
+    """
+    Returns the number of nodes an uncached minimax search visits
+    below the board, as minimax_score did before caching, memoized
+    by encoded board in sizes.
+    """
+    key = ttt.encode(board)
+    if key not in sizes:
+        sizes[key] = 1
+        if not ttt.terminal(board):
+            sizes[key] += sum(tree_size(ttt.result(board, action), sizes)
+                              for action in ttt.actions(board))
+    return sizes[key]
+
+
+def nodes_for(board, alpha_beta):
+    """
+    Returns the nodes searched, with empty tables, to choose a move.
+    """
+    ttt.transposition_table.clear()
+    ttt.bounds_table.clear()
+    ttt.stats["nodes"] = ttt.stats["hits"] = 0
+    action = ttt.minimax(board, alpha_beta=alpha_beta, use_book=False)
+    return ttt.stats["nodes"], action
+
+
+def compare_positions():
+    """
+    Compares the nodes searched from every reachable non-terminal
+    position by uncached minimax, minimax with a transposition table,
+    and alpha-beta search, checking that both searches agree.
+    """
+    totals = defaultdict(lambda: [0, 0, 0, 0])
+    sizes = {}
+    for board in reachable_positions():
+        if ttt.terminal(board):
+            continue
+        uncached = sum(tree_size(ttt.result(board, action), sizes)
+                       for action in ttt.actions(board))
+        cached, action = nodes_for(board, alpha_beta=False)
+        pruned, pruned_action = nodes_for(board, alpha_beta=True)
+        if action != pruned_action:
+            sys.exit(f"Searches disagree on {board}.")
+
+        moves = sum(cell is not None for row in board for cell in row)
+        for row in (totals[moves], totals["all"]):
+            row[0] += 1
+            row[1] += uncached
+            row[2] += cached
+            row[3] += pruned
+
+    print(f"{'moves':>5} {'positions':>9} {'uncached':>10} "
+          f"{'cached':>8} {'alpha-beta':>10}")
+    for moves in sorted(totals, key=lambda moves: (moves == "all", str(moves))):
+        count, uncached, cached, pruned = totals[moves]
+        print(f"{moves:>5} {count:>9} {uncached:>10} {cached:>8} {pruned:>10}")
+
+
+def compare_workers(m=4, n=4, k=4, depth=7):
+    """
+    Times a depth-limited search of the empty m-by-n board, won with
+    k in a row, with the root children split across growing numbers of
+    worker processes, checking that every split agrees on the move.
+    """
+    board = ttt.initial_state(m, n)
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print(f"{m}x{n} board, {k} in a row, depth {depth}, "
+          f"{os.cpu_count()} CPUs available")
+    print(f"{'workers':>7} {'seconds':>8} {'speedup':>7}")
+    baseline = expected = None
+    for workers in counts:
+        # Start the pool before timing, so that only the search is timed
+        if workers > 1:
+            ttt.deepening(board, k, workers=workers, max_depth=1)
+        start = time.perf_counter()
+        action = ttt.deepening(board, k, math.inf, workers, max_depth=depth)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        expected = expected or action
+        if action != expected:
+            sys.exit(f"{workers} workers chose {action}, not {expected}.")
+        print(f"{workers:>7} {elapsed:>8.3f} {baseline / elapsed:>6.2f}x")
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "game"
+    if len(sys.argv) > 2 or command not in ("game", "positions", "parallel"):
+        sys.exit("Usage: python benchmark.py [game|positions|parallel]")
+
+    if command == "positions":
+        compare_positions()
+        return
+
+    if command == "parallel":
+        compare_workers()
+        return
+
+    ttt.transposition_table.clear()
+    print("Cold transposition table:")
+    play_game()
+    print(f"Positions in table: {len(ttt.transposition_table)}")
+    print("Warm transposition table:")
+    play_game()
+
+
+if __name__ == "__main__":
+    main()
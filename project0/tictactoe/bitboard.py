@@ -0,0 +1,264 @@
+"""
+Bitboard representation of m-by-n Tic Tac Toe boards, won with k in a row.
+
+A board is a pair (x, o) of masks, one per player, where cell (i, j) is
+bit n * i + j. Moves are applied with a single bitwise or, turns are
+found from the number of bits set, and wins are checked against the
+masks of every line of k cells, or looked up in a table built from them
+on small boards.
+
+The board's symmetries (rotations and reflections, 8 on a square board
+and 4 otherwise) are applied to masks through lookup tables, so that
+positions that are symmetric to each other share one canonical form.
+"""
+from functools import cache
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Largest number of cells for which whole masks index lookup tables;
+# masks of larger boards are looked up in chunks of CHUNK bits
+TABLE_BITS = 12
+CHUNK = 8
+
+
+class Geometry():
+
+    def __init__(self, m=3, n=3, k=3):
+        """
+        Create the geometry of an m-by-n board won with k in a row.
+        """
+        if m < 1 or n < 1 or not 1 <= k <= max(m, n):
+            raise ValueError(f"cannot get {k} in a row on a {m}x{n} board")
+        self.m, self.n, self.k = m, n, k
+        self.size = m * n
+
+        # Mask with every cell set
+        self.full = (1 << self.size) - 1
+
+        # Masks of every row, column and diagonal run of k cells, and
+        # of those through each cell
+        self.lines = self.find_lines()
+        self.lines_through = [[line for line in self.lines if line >> cell & 1]
+                              for cell in range(self.size)]
+
+        # Whether each possible mask of one player holds a line
+        self.wins = None
+        if self.size <= TABLE_BITS:
+            self.wins = [self.holds_line(mask) for mask in range(self.full + 1)]
+
+        # Images of each chunk of a mask under each symmetry
+        self.symmetries = self.find_symmetries()
+        self.chunk = self.size if self.size <= TABLE_BITS else CHUNK
+        self.images = [
+            [[sum(1 << perm[start + bit] for bit in range(self.chunk)
+                  if start + bit < self.size and value >> bit & 1)
+              for value in range(1 << self.chunk)]
+             for start in range(0, self.size, self.chunk)]
+            for perm in self.symmetries
+        ]
+
+        # Cells from the center of the board outwards
+        center = ((m - 1) / 2, (n - 1) / 2)
+        self.order = sorted(range(self.size), key=lambda cell: (
+            abs(cell // n - center[0]) + abs(cell % n - center[1]), cell
+        ))
+
+    def find_lines(self):
+        """
+        Returns the masks of every run of k cells in a row, column
+        or diagonal.
+        """
+        m, n, k = self.m, self.n, self.k
+        lines = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for i in range(m):
+                for j in range(n):
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < m and 0 <= end_j < n:
+                        lines.append(sum(1 << (n * (i + di * step) + j + dj * step)
+                                         for step in range(k)))
+        return lines
+
+    def find_symmetries(self):
+        """
+        Returns the symmetries of the board, each as a list mapping every
+        cell to the cell it moves to, starting with the identity.
+        """
+        m, n = self.m, self.n
+        maps = [lambda i, j: (i, j),
+                lambda i, j: (i, n - 1 - j),
+                lambda i, j: (m - 1 - i, j),
+                lambda i, j: (m - 1 - i, n - 1 - j)]
+        if m == n:
+            maps += [lambda i, j: (j, i),
+                     lambda i, j: (j, n - 1 - i),
+                     lambda i, j: (m - 1 - j, i),
+                     lambda i, j: (m - 1 - j, n - 1 - i)]
+        perms = []
+        for transform in maps:
+            perm = []
+            for cell in range(self.size):
+                i, j = transform(*divmod(cell, n))
+                perm.append(n * i + j)
+            perms.append(perm)
+        return perms
+
+    def cell(self, action):
+        """
+        Returns the bit index of action (i, j).
+        """
+        i, j = action
+        return self.n * i + j
+
+    def action(self, cell):
+        """
+        Returns the action (i, j) for a bit index.
+        """
+        return divmod(cell, self.n)
+
+    def from_board(self, board):
+        """
+        Returns the (x, o) masks of a list-of-lists board.
+        """
+        x = o = 0
+        for i, row in enumerate(board):
+            for j, mark in enumerate(row):
+                if mark == X:
+                    x |= 1 << (self.n * i + j)
+                elif mark == O:
+                    o |= 1 << (self.n * i + j)
+        return x, o
+
+    def to_board(self, x, o):
+        """
+        Returns the list-of-lists board for masks x and o.
+        """
+        board = []
+        for i in range(self.m):
+            row = []
+            for j in range(self.n):
+                bit = 1 << (self.n * i + j)
+                row.append(X if x & bit else O if o & bit else EMPTY)
+            board.append(row)
+        return board
+
+    def image(self, symmetry, mask):
+        """
+        Returns the image of a mask under the symmetry with that index.
+        """
+        image = 0
+        for chunk, images in enumerate(self.images[symmetry]):
+            image |= images[mask >> (chunk * self.chunk) & ((1 << self.chunk) - 1)]
+        return image
+
+    def canonical(self, x, o):
+        """
+        Returns the canonical form of the masks x and o, the least (x, o)
+        among their images under the board's symmetries, as
+        (x, o, symmetry), where symmetry indexes the symmetries that
+        maps them onto it.
+        """
+        best_x, best_o, best = x, o, 0
+        if self.chunk == self.size:
+            # Whole masks index the tables
+            for symmetry in range(1, len(self.images)):
+                images = self.images[symmetry][0]
+                image_x, image_o = images[x], images[o]
+                if image_x < best_x or (image_x == best_x and image_o < best_o):
+                    best_x, best_o, best = image_x, image_o, symmetry
+            return best_x, best_o, best
+
+        for symmetry in range(1, len(self.images)):
+            image_x = self.image(symmetry, x)
+            if image_x > best_x:
+                continue
+            image_o = self.image(symmetry, o)
+            if image_x < best_x or image_o < best_o:
+                best_x, best_o, best = image_x, image_o, symmetry
+        return best_x, best_o, best
+
+    def x_to_move(self, x, o):
+        """
+        Returns True if X has the next turn, False if O has.
+        """
+        return x.bit_count() <= o.bit_count()
+
+    def empty_cells(self, x, o):
+        """
+        Returns the bit indices of the empty cells, in increasing order.
+        """
+        free = self.full & ~(x | o)
+        return [i for i in range(self.size) if free >> i & 1]
+
+    def move(self, x, o, cell):
+        """
+        Returns the masks after the player to move takes the empty cell.
+        """
+        if self.x_to_move(x, o):
+            return x | 1 << cell, o
+        return x, o | 1 << cell
+
+    def holds_line(self, mask):
+        """
+        Returns True if a player's mask holds a whole line.
+        """
+        if self.wins is not None:
+            return self.wins[mask]
+        return any(mask & line == line for line in self.lines)
+
+    def holds_line_through(self, mask, cell):
+        """
+        Returns True if a player's mask holds a whole line through cell,
+        as it must if the player has just won by taking cell.
+        """
+        if self.wins is not None:
+            return self.wins[mask]
+        return any(mask & line == line for line in self.lines_through[cell])
+
+    def winner(self, x, o):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        if self.holds_line(x):
+            return X
+        if self.holds_line(o):
+            return O
+        return None
+
+    def terminal(self, x, o):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        return self.holds_line(x) or self.holds_line(o) or x | o == self.full
+
+    def utility(self, x, o):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        if self.holds_line(x):
+            return 1
+        if self.holds_line(o):
+            return -1
+        return 0
+
+    def __reduce__(self):
+        """
+        Pickles the geometry by size, so that processes receiving it use
+        their own cached one rather than copies of its tables.
+        """
+        return geometry, (self.m, self.n, self.k)
+
+
+@cache
+def geometry(m=3, n=3, k=3):
+    """
+    Returns the Geometry of an m-by-n board won with k in a row,
+    built once per size.
+    """
+    return Geometry(m, n, k)
+
+
+# The standard 3-by-3 board, won with 3 in a row
+STANDARD = geometry(3, 3, 3)
@@ -0,0 +1,63 @@
+"""
+Opening book of perfect-play moves for Tic Tac Toe.
+
+The book holds the move minimax chooses in every reachable position
+where the game is not over, so that the AI can answer from a table
+instead of searching. It is written by make_book.py.
+
+Layout: an 8-byte magic string, then an array of 32-bit entries sorted
+in increasing order, each holding a position's (x, o) bitboard masks
+and the cell of its best move as x << 13 | o << 4 | cell.
+"""
+import os
+import sys
+from array import array
+
+MAGIC = b"TTTBOOK1"
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# Typecode for book entries (32-bit unsigned integers)
+ENTRY = "I"
+
+
+def key(x, o):
+    """
+    Returns the book key of the bitboard (x, o).
+    """
+    return x << 9 | o
+
+
+def load(path=PATH):
+    """
+    Returns the book at path as a dict mapping keys to best cells,
+    or None if there is no book or it cannot be read.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:8] != MAGIC or (len(data) - 8) % 4:
+        return None
+
+    entries = array(ENTRY)
+    entries.frombytes(data[8:])
+    if sys.byteorder == "big":
+        entries.byteswap()
+    return {entry >> 4: entry & 0b1111 for entry in entries}
+
+
+def save(moves, path=PATH):
+    """
+    Writes a book of moves, a dict mapping keys to best cells, to path.
+    """
+    entries = array(ENTRY, sorted(k << 4 | cell for k, cell in moves.items()))
+    if sys.byteorder == "big":
+        entries.byteswap()
+
+    # Write to a temporary file so readers never see a partial book
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(entries.tobytes())
+    os.replace(temporary, path)
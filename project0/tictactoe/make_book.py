@@ -0,0 +1,81 @@
+"""
+Builds and checks the Tic Tac Toe opening book.
+
+Usage: python make_book.py [generate|verify]
+"""
+import sys
+
+import book
+import tictactoe as ttt
+from bitboard import STANDARD
+
+
+def positions():
+    """
+    Returns the (x, o) bitboard of every reachable position where the
+    game is not over.
+    """
+    seen = set()
+    frontier = [(0, 0)]
+    while frontier:
+        x, o = frontier.pop()
+        if (x, o) in seen or STANDARD.terminal(x, o):
+            continue
+        seen.add((x, o))
+        frontier.extend(STANDARD.move(x, o, cell)
+                        for cell in STANDARD.empty_cells(x, o))
+    return sorted(seen)
+
+
+def generate():
+    """
+    Returns a book of the move that minimax, searching, chooses in
+    every reachable position where the game is not over.
+    """
+    moves = {}
+    for x, o in positions():
+        action = ttt.minimax(STANDARD.to_board(x, o), use_book=False)
+        moves[book.key(x, o)] = STANDARD.cell(action)
+    return moves
+
+
+def verify(moves):
+    """
+    Returns the list of reachable boards, where the game is not over,
+    on which the book of moves disagrees with either search.
+    """
+    mismatches = []
+    for x, o in positions():
+        board = STANDARD.to_board(x, o)
+        cell = moves.get(book.key(x, o))
+        action = None if cell is None else STANDARD.action(cell)
+        if (action != ttt.minimax(board, use_book=False)
+                or action != ttt.minimax(board, alpha_beta=True, use_book=False)):
+            mismatches.append(board)
+    return mismatches
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "generate"
+    if len(sys.argv) > 2 or command not in ("generate", "verify"):
+        sys.exit("Usage: python make_book.py [generate|verify]")
+
+    if command == "generate":
+        moves = generate()
+        book.save(moves)
+        print(f"Wrote {len(moves)} positions to {book.PATH}.")
+        return
+
+    moves = book.load()
+    if moves is None:
+        sys.exit(f"No book at {book.PATH}.")
+    mismatches = verify(moves)
+    for board in mismatches:
+        print(f"Book disagrees with search on {board}.")
+    if mismatches:
+        sys.exit(1)
+    print(f"Book agrees with search on all {len(moves)} positions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import pygame
+import queue
 import sys
+import threading
 import time
 
 import tictactoe as ttt
@@ -17,9 +19,35 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# Seconds the computer is shown thinking before its move is played
+AI_DELAY = 0.5
+
+# Frames drawn per second at most
+FPS = 60
+
+clock = pygame.time.Clock()
+
+# The computer's moves, as (generation, move), computed in the background
+ai_moves = queue.Queue()
+
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# Counts games started, so that moves computed for an earlier game are dropped
+generation = 0
+
+# Whether a move is being computed for the current board, and since when
+thinking = False
+thinking_since = 0
+
+
+def think(board, generation):
+    """
+    Computes the computer's move on a background thread, so that the
+    window keeps responding, and hands it to the event loop.
+    """
+    ai_moves.put((generation, ttt.minimax(board)))
+
 
 while True:
 
@@ -102,21 +130,28 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            dots = "." * (int(time.monotonic() * 3) % 3 + 1)
+            title = f"Computer thinking{dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Check for AI move, started in the background and played once
+        # it is ready and has been shown thinking for AI_DELAY
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if not thinking:
+                thinking = True
+                thinking_since = time.monotonic()
+                threading.Thread(
+                    target=think, args=(board, generation), daemon=True
+                ).start()
+            elif time.monotonic() - thinking_since >= AI_DELAY:
+                while not ai_moves.empty():
+                    move_generation, move = ai_moves.get()
+                    if move_generation == generation:
+                        board = ttt.result(board, move)
+                        thinking = False
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -127,20 +162,23 @@ while True:
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+        # Offer a new game, dropping any move still being computed
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        again = mediumFont.render("Play Again" if game_over else "Reset",
+                                  True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                user = None
+                board = ttt.initial_state()
+                generation += 1
+                thinking = False
 
     pygame.display.flip()
+    clock.tick(FPS)
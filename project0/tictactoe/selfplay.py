@@ -0,0 +1,133 @@
+"""
+Headless self-play for the tic-tac-toe AI.
+
+Plays games of the AI against itself and against a random player,
+without pygame or a display, and reports games per second, the latency
+of the AI's moves and the nodes it searched, to track the engine's
+performance.
+
+Usage:
+    python selfplay.py [-g games] [--opponent ai|random|both]
+                       [--size M N K] [--time-limit S] [--no-book] [--cold]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def play(opponent, rng, options, m=3, n=3, k=3):
+    """
+    Plays one game from the empty m-by-n board, won with k in a row,
+    of the AI against opponent, "ai" or "random". Against the random
+    player, the AI plays X or O at random.
+
+    Returns (winner, latencies, nodes) with the seconds and nodes that
+    each of the AI's moves took.
+    """
+    board = ttt.initial_state(m, n)
+    ai_player = ttt.X if opponent == "ai" or rng.random() < 0.5 else ttt.O
+    latencies = []
+    nodes = []
+    while not ttt.terminal(board, k):
+        if opponent == "ai" or ttt.player(board) == ai_player:
+            ttt.stats["nodes"] = ttt.stats["hits"] = 0
+            start = time.perf_counter()
+            action = ttt.minimax(board, k=k, **options)
+            latencies.append(time.perf_counter() - start)
+            nodes.append(ttt.stats["nodes"])
+        else:
+            action = rng.choice(sorted(ttt.actions(board)))
+        board = ttt.result(board, action)
+
+    winner = ttt.winner(board, k)
+    if opponent == "random" and winner is not None:
+        winner = "ai" if winner == ai_player else "random"
+    return winner, latencies, nodes
+
+
+def report(opponent, games, rng, options, size, cold=False):
+    """
+    Plays games against opponent and prints their outcomes, games per
+    second, move latency percentiles and nodes searched. If cold, all
+    search tables, including those of worker processes, are cleared
+    before each game.
+    """
+    outcomes = {}
+    latencies = []
+    nodes = []
+    start = time.perf_counter()
+    for _ in range(games):
+        if cold:
+            ttt.reset()
+        winner, game_latencies, game_nodes = play(opponent, rng, options, *size)
+        outcomes[winner] = outcomes.get(winner, 0) + 1
+        latencies += game_latencies
+        nodes += game_nodes
+    elapsed = time.perf_counter() - start
+
+    print(f"AI vs {opponent}: {games} games in {elapsed:.3f}s, "
+          f"{games / elapsed:.1f} games/sec")
+    print("  outcomes: " + ", ".join(
+        f"{'draw' if winner is None else winner} {count}"
+        for winner, count in sorted(outcomes.items(), key=str)
+    ))
+    if len(latencies) > 1:
+        percentiles = statistics.quantiles(latencies, n=100,
+                                          method="inclusive")
+        print(f"  move latency: p50 {percentiles[49] * 1000:.3f}ms, "
+              f"p90 {percentiles[89] * 1000:.3f}ms, "
+              f"p99 {percentiles[98] * 1000:.3f}ms, "
+              f"max {max(latencies) * 1000:.3f}ms over {len(latencies)} moves")
+    if nodes:
+        print(f"  nodes: {sum(nodes)} total, {statistics.mean(nodes):.1f} "
+              f"per move, {max(nodes)} max")
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("-g", "--games", type=int, default=100,
+                        help="games per opponent (default: 100)")
+    parser.add_argument("--opponent", default="both",
+                        choices=["ai", "random", "both"])
+    parser.add_argument("--size", type=int, nargs=3, default=[3, 3, 3],
+                        metavar=("M", "N", "K"),
+                        help="board rows, columns and marks in a row to win")
+    parser.add_argument("--time-limit", type=float,
+                        help="seconds of depth-limited search per move")
+    parser.add_argument("--alpha-beta", action="store_true",
+                        help="use alpha-beta search on the 3x3 board")
+    parser.add_argument("--no-book", action="store_true",
+                        help="search instead of using the opening book")
+    parser.add_argument("--cold", action="store_true",
+                        help="clear all search tables before each game")
+    parser.add_argument("-w", "--workers", type=int, default=1,
+                        help="worker processes per search (default: 1)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    options = {"alpha_beta": args.alpha_beta, "use_book": not args.no_book,
+               "time_limit": args.time_limit, "workers": args.workers}
+    rng = random.Random(args.seed)
+    opponents = ["ai", "random"] if args.opponent == "both" else [args.opponent]
+    for opponent in opponents:
+        outcomes = report(opponent, args.games, rng, options, args.size,
+                          args.cold)
+
+        # Perfect play on the 3x3 board never loses, so it always draws
+        # against itself
+        if args.size == [3, 3, 3] and args.time_limit is None:
+            if opponent == "random":
+                lost = outcomes.get("random", 0)
+            else:
+                lost = args.games - outcomes.get(None, 0)
+            if lost:
+                sys.exit(f"The AI lost {lost} games against {opponent}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,76 @@
 """
 Tic Tac Toe Player
 """
-import copy
 import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bitboard
+import book
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# The 3-by-3 board won with 3 in a row, which is solved exhaustively;
+# other boards are searched to a depth that fits a time budget
+STANDARD = bitboard.STANDARD
+
+# Maps canonical (x, o) bitboards to their minimax scores, shared across calls
+transposition_table = {}
+
+# Maps canonical (x, o) bitboards to (bound, score, best cell) from
+# alpha-beta search
+bounds_table = {}
+
+# Kinds of bound on a score stored in bounds_table
+EXACT = "exact"
+LOWER = "lower"
+UPPER = "upper"
+
+# Order in which alpha-beta search tries moves: center, corners, edges
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+CELL_ORDER = [STANDARD.cell(action) for action in MOVE_ORDER]
+
+# Counts of positions searched and transposition table hits
+stats = {"nodes": 0, "hits": 0}
+
+# Maps book keys of positions to their best cells, or None without a book
+opening_book = book.load()
+
+# Default seconds of depth-limited search per move
+TIME_LIMIT = 1.0
+
+# Score of a won position in depth-limited search, less the number of
+# marks on the board, so that quicker wins score higher
+WIN = 1_000_000
+
+# Number of nodes searched between checks of the time budget
+CHECK_INTERVAL = 1024
+
+
+# Process pools for searching root children in parallel, by size
+pools = {}
+
+# Table of this worker process's depth-limited searches, and the root
+# position they are for
+worker_search = {"root": None, "table": {}}
+
+
+class SearchTimeout(Exception):
+    """
+    Raised to abandon a depth-limited search once its time is up.
+    """
+
 
-def initial_state():
+def initial_state(m=3, n=3):
     """
-    Returns starting state of the board.
+    Returns starting state of an m-by-n board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * n for _ in range(m)]
 
 
 def player(board):
@@ -33,7 +88,8 @@ def actions(board):
     Returns set of all possible actions (i, j) available on the board.
     """
     # Return all empty cell coordinates as possible moves
-    return {(i, j) for i in range(3) for j in range(3) if board[i][j] is None}
+    return {(i, j) for i in range(len(board)) for j in range(len(board[i]))
+            if board[i][j] is None}
 
 
 def result(board, action):
@@ -43,57 +99,47 @@ def result(board, action):
     i, j = action
 
     # New check for out-of-bounds indices
-    if not (0 <= i < 3 and 0 <= j < 3):
+    if not (0 <= i < len(board) and 0 <= j < len(board[0])):
         raise Exception("Invalid move: cell position is out of bounds.")
 
     if board[i][j] is not None:
         raise Exception("invalid move: cell is already filled.")
 
-    # Use deepcopy to avoid mutating original board
-    new_board = copy.deepcopy(board)
+    # Copy each row to avoid mutating original board
+    new_board = [row[:] for row in board]
     new_board[i][j] = player(board)
     return new_board
 
 
-def winner(board):
+def geometry(board, k=3):
     """
-    Returns the winner of the game, if there is one.
+    Returns the bitboard Geometry of a board won with k in a row.
     """
-    # Check all rows and columns
-    for i in range(3):
-        if board[i][0] == board[i][1] == board[i][2] != None:
-            return board[i][0]
-        if board[0][i] == board[1][i] == board[2][i] != None:
-            return board[0][i]
+    return bitboard.geometry(len(board), len(board[0]), k)
 
-    # Check both diagonals
-    if board[0][0] == board[1][1] == board[2][2] != None:
-        return board[0][0]
-    if board[0][2] == board[1][1] == board[2][0] != None:
-        return board[0][2]
 
-    return None
+def winner(board, k=3):
+    """
+    Returns the winner of the game, won with k in a row, if there is one.
+    """
+    shape = geometry(board, k)
+    return shape.winner(*shape.from_board(board))
 
 
-def terminal(board):
+def terminal(board, k=3):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) != None:
-        return True
-    # If any empty cell remains, game is not over
-    for row in board:
-        if None in row:
-            return False
+    # One pass over the board finds both a winner and whether it is full
+    shape = geometry(board, k)
+    return shape.terminal(*shape.from_board(board))
 
-    return True
 
-
-def utility(board):
+def utility(board, k=3):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    win = winner(board)
+    win = winner(board, k)
     if win == X:
         return 1
     elif win == O:
@@ -102,45 +148,478 @@ def utility(board):
         return 0
 
 
+def encode(board):
+    """
+    Returns a hashable encoding of a board, as its (x, o) bitboard masks.
+    """
+    return STANDARD.from_board(board)
+
+
 def minimax_score(board):
     """
     Returns the minimax score of a board (used internally).
     """
+    return minimax_bits(*encode(board))
+
+
+def minimax_bits(x, o):
+    """
+    Returns the minimax score of the bitboard (x, o) (used internally).
+    """
+    # Reuse the score if this position, or a symmetric one, has been
+    # searched before, and otherwise search its canonical form
+    x, o, _ = STANDARD.canonical(x, o)
+    key = (x, o)
+    score = transposition_table.get(key)
+    if score is not None:
+        stats["hits"] += 1
+        return score
+    stats["nodes"] += 1
+
     # Base case: game over
-    if terminal(board):
-        return utility(board)
+    if STANDARD.terminal(x, o):
+        score = STANDARD.utility(x, o)
 
     # Recursively evaluate best/worst outcome
-    if player(board) == X:
-        return max(minimax_score(result(board, action)) for action in actions(board))
+    elif STANDARD.x_to_move(x, o):
+        score = max(minimax_bits(x | 1 << cell, o)
+                    for cell in STANDARD.empty_cells(x, o))
     else:
-        return min(minimax_score(result(board, action)) for action in actions(board))
+        score = min(minimax_bits(x, o | 1 << cell)
+                    for cell in STANDARD.empty_cells(x, o))
+
+    transposition_table[key] = score
+    return score
 
 
-def minimax(board):
+def ordered_cells(x, o, first=None):
+    """
+    Returns the empty cells of the bitboard (x, o) in MOVE_ORDER,
+    with the cell `first` moved to the front if given.
+    """
+    taken = x | o
+    cells = [cell for cell in CELL_ORDER if not taken >> cell & 1]
+    if first in cells:
+        cells.remove(first)
+        cells.insert(0, first)
+    return cells
+
+
+def alphabeta_score(board, alpha, beta):
+    """
+    Returns the minimax score of a board if it lies between alpha and
+    beta, an upper bound on it if it is at most alpha, or a lower bound
+    on it if it is at least beta (used internally).
+    """
+    return alphabeta_bits(*encode(board), alpha, beta)
+
+
+def alphabeta_bits(x, o, alpha, beta):
+    """
+    Returns the score or bound that alphabeta_score does, for the
+    bitboard (x, o) (used internally).
+    """
+    # Reuse a stored score, or bound on it, that settles this window.
+    # Positions are stored and searched in canonical form, so the best
+    # cell stored for a position is in its canonical frame too.
+    x, o, _ = STANDARD.canonical(x, o)
+    key = (x, o)
+    entry = bounds_table.get(key)
+    best_cell = None
+    if entry is not None:
+        bound, score, best_cell = entry
+        if (bound == EXACT
+                or (bound == LOWER and score >= beta)
+                or (bound == UPPER and score <= alpha)):
+            stats["hits"] += 1
+            return score
+    stats["nodes"] += 1
+
+    if STANDARD.terminal(x, o):
+        score = STANDARD.utility(x, o)
+        bounds_table[key] = (EXACT, score, None)
+        return score
+
+    # Search the previous best cell first, then MOVE_ORDER
+    window = (alpha, beta)
+    if STANDARD.x_to_move(x, o):
+        score = -math.inf
+        for cell in ordered_cells(x, o, best_cell):
+            child = alphabeta_bits(x | 1 << cell, o, alpha, beta)
+            if child > score:
+                score, best_cell = child, cell
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+    else:
+        score = math.inf
+        for cell in ordered_cells(x, o, best_cell):
+            child = alphabeta_bits(x, o | 1 << cell, alpha, beta)
+            if child < score:
+                score, best_cell = child, cell
+            beta = min(beta, score)
+            if alpha >= beta:
+                break
+
+    if score <= window[0]:
+        bound = UPPER
+    elif score >= window[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
+    bounds_table[key] = (bound, score, best_cell)
+    return score
+
+
+def distinct_actions(board):
+    """
+    Returns (action, child) pairs for the possible actions on the board,
+    in the order of actions(board), where child is the bitboard that the
+    action results in. Actions whose child is symmetric to an earlier
+    one are left out, since their score is the same.
+    """
+    x, o = encode(board)
+    x_moves = player(board) == X
+    pairs = []
+    seen = set()
+    for action in actions(board):
+        bit = 1 << STANDARD.cell(action)
+        child = (x | bit, o) if x_moves else (x, o | bit)
+        key = STANDARD.canonical(*child)[:2]
+        if key not in seen:
+            seen.add(key)
+            pairs.append((action, child))
+    return pairs
+
+
+def minimax(board, alpha_beta=False, use_book=True, k=3, time_limit=None,
+            workers=1):
     """
     Returns the optimal action for the current player on the board.
+
+    On the 3-by-3 board won with 3 in a row, the action is looked up in
+    the opening book if there is one, unless use_book is False, and
+    otherwise found by exhaustive search. With alpha_beta, children are
+    searched with alpha-beta pruning and move ordering, which returns
+    the same action with fewer nodes.
+
+    On any other board won with k in a row, or if a time_limit is given,
+    the action is the best found by iterative deepening search within
+    time_limit seconds (TIME_LIMIT by default).
+
+    With more than one worker, the children of the board are searched
+    in a pool of that many processes, and the same action is returned.
     """
-    if terminal(board):
+    if terminal(board, k):
         return None
 
+    if time_limit is not None or geometry(board, k) is not STANDARD:
+        return deepening(board, k, time_limit or TIME_LIMIT, workers)
+
+    if use_book and opening_book is not None:
+        cell = opening_book.get(book.key(*encode(board)))
+        if cell is not None:
+            return STANDARD.action(cell)
+
+    if workers > 1:
+        return minimax_parallel(board, alpha_beta, workers)
+
+    if alpha_beta:
+        return minimax_alphabeta(board)
+
     best_action = None
 
     # Maximizing player (X)
     if player(board) == X:
         best_score = float('-inf')
-        for action in actions(board):
-            score = minimax_score(result(board, action))
+        for action, child in distinct_actions(board):
+            score = minimax_bits(*child)
             if score > best_score:
                 best_score = score
                 best_action = action
     # Minimizing player (O)
     else:
         best_score = float('inf')
-        for action in actions(board):
-            score = minimax_score(result(board, action))
+        for action, child in distinct_actions(board):
+            score = minimax_bits(*child)
+            if score < best_score:
+                best_score = score
+                best_action = action
+
+    return best_action
+
+
+def minimax_alphabeta(board):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta search below the root.
+    """
+    # Root actions are tried in the same order as minimax, and an action
+    # is only taken if it strictly improves on the best so far, so ties
+    # are broken exactly as minimax breaks them. Skipping an action that
+    # is symmetric to an earlier one cannot change this, as its score
+    # could not strictly improve on the earlier one's. Each child only
+    # has to be searched well enough to tell whether it beats the best.
+    best_action = None
+    if player(board) == X:
+        best_score = -math.inf
+        for action, child in distinct_actions(board):
+            score = alphabeta_bits(*child, best_score, math.inf)
+            if score > best_score:
+                best_score = score
+                best_action = action
+    else:
+        best_score = math.inf
+        for action, child in distinct_actions(board):
+            score = alphabeta_bits(*child, -math.inf, best_score)
             if score < best_score:
                 best_score = score
                 best_action = action
 
     return best_action
+
+
+def minimax_parallel(board, alpha_beta, workers):
+    """
+    Returns the optimal action for the current player on the board,
+    searching its children in a pool of workers processes.
+    """
+    # Children are scored exactly, whichever search is used, and merged
+    # in the order minimax tries them, so ties are broken as it does
+    pairs = distinct_actions(board)
+    results = pool(workers).map(
+        child_score, [child for _, child in pairs], [alpha_beta] * len(pairs)
+    )
+
+    maximizing = player(board) == X
+    best_action = best_score = None
+    for (action, _), (score, nodes, hits) in zip(pairs, results):
+        stats["nodes"] += nodes
+        stats["hits"] += hits
+        if (best_action is None
+                or (score > best_score if maximizing else score < best_score)):
+            best_score = score
+            best_action = action
+    return best_action
+
+
+def child_score(child, alpha_beta):
+    """
+    Returns (score, nodes, hits): the minimax score of the bitboard
+    child, searched in a worker process, with the nodes searched and
+    table hits it took, for the parent's stats (used internally).
+    """
+    nodes, hits = stats["nodes"], stats["hits"]
+    if alpha_beta:
+        score = alphabeta_bits(*child, -math.inf, math.inf)
+    else:
+        score = minimax_bits(*child)
+    return score, stats["nodes"] - nodes, stats["hits"] - hits
+
+
+def pool(workers):
+    """
+    Returns a pool of workers processes, started on first use and kept
+    for later searches. Forked workers start with copies of this
+    process's tables.
+    """
+    executor = pools.get(workers)
+    if executor is None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None
+        )
+        executor = pools[workers] = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context
+        )
+    return executor
+
+
+def reset():
+    """
+    Forgets all search results: clears the transposition tables, shuts
+    down the worker pools, whose forked tables would otherwise outlive
+    them, and clears this process's depth-limited search table.
+    """
+    transposition_table.clear()
+    bounds_table.clear()
+    for executor in pools.values():
+        executor.shutdown()
+    pools.clear()
+    worker_search["root"] = None
+    worker_search["table"] = {}
+
+
+def deepening(board, k=3, time_limit=TIME_LIMIT, workers=1, max_depth=None):
+    """
+    Returns the best action for the current player on a board won with
+    k in a row, found by alpha-beta searches to increasing depths until
+    time_limit seconds have passed, the outcome is certain, or max_depth
+    is reached. With more than one worker, the children of the board are
+    searched in a pool of that many processes at each depth.
+    """
+    start = time.monotonic()
+    shape = geometry(board, k)
+    x, o = shape.from_board(board)
+    me, them = (x, o) if shape.x_to_move(x, o) else (o, x)
+    empty = shape.size - (x | o).bit_count()
+    if max_depth is not None:
+        empty = min(empty, max_depth)
+
+    # Maps (mover's, opponent's) bitboards to (depth, bound, score, best
+    # cell) from searches to depth, kept across depths so that each one
+    # tries the previous best cells first
+    table = {}
+
+    # The first depth is always searched to completion
+    deadline = None
+    best_cell = None
+    for depth in range(1, empty + 1):
+        try:
+            if workers > 1:
+                score, best_cell = split_root(
+                    shape, me, them, depth, best_cell, deadline, workers
+                )
+            else:
+                score = negamax(shape, me, them, depth, -math.inf, math.inf,
+                                table, deadline)
+                best_cell = table[(me, them)][3]
+        except SearchTimeout:
+            break
+        if abs(score) > WIN - shape.size - 1:
+            break
+        deadline = start + time_limit
+    return shape.action(best_cell)
+
+
+def split_root(shape, me, them, depth, first, deadline, workers):
+    """
+    Returns (score, best cell) for the player to move on the bitboard
+    where they hold `me` and the opponent holds `them`, searched depth
+    moves ahead with each child in a pool of workers processes, trying
+    the cell `first` before the rest as negamax would (used internally).
+    """
+    taken = me | them
+    cells = [cell for cell in shape.order if not taken >> cell & 1]
+    if first in cells:
+        cells.remove(first)
+        cells.insert(0, first)
+
+    executor = pool(workers)
+    futures = [executor.submit(search_child, shape.m, shape.n, shape.k,
+                               me, them, cell, depth, deadline)
+               for cell in cells]
+    try:
+        best_score, best_cell = -math.inf, None
+        for cell, future in zip(cells, futures):
+            score, nodes, hits = future.result()
+            stats["nodes"] += nodes
+            stats["hits"] += hits
+            if score > best_score:
+                best_score, best_cell = score, cell
+        return best_score, best_cell
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def search_child(m, n, k, me, them, cell, depth, deadline):
+    """
+    Returns (score, nodes, hits): the score, for the player holding `me`,
+    of taking cell and searching on depth moves ahead, in a worker
+    process, with the nodes searched and table hits it took, for the
+    parent's stats (used internally). Each worker keeps one table across
+    the depths searched from the same root position.
+    """
+    shape = bitboard.geometry(m, n, k)
+    root = (m, n, k, me, them)
+    if worker_search["root"] != root:
+        worker_search["root"] = root
+        worker_search["table"] = {}
+
+    mine = me | 1 << cell
+    if shape.holds_line_through(mine, cell):
+        return WIN - ((me | them).bit_count() + 1), 0, 0
+    nodes, hits = stats["nodes"], stats["hits"]
+    score = -negamax(shape, them, mine, depth - 1, -math.inf, math.inf,
+                     worker_search["table"], deadline)
+    return score, stats["nodes"] - nodes, stats["hits"] - hits
+
+
+def negamax(shape, me, them, depth, alpha, beta, table, deadline):
+    """
+    Returns the score, for the player to move, of the bitboard where
+    that player holds `me` and the opponent holds `them`, searched
+    depth moves ahead: exact if it lies between alpha and beta, and
+    otherwise a bound as in alphabeta_score (used internally).
+    """
+    # Reuse a stored score, or bound on it, from a search at least as deep
+    key = (me, them)
+    entry = table.get(key)
+    best_cell = None
+    if entry is not None:
+        entry_depth, bound, score, best_cell = entry
+        if entry_depth >= depth and (
+                bound == EXACT
+                or (bound == LOWER and score >= beta)
+                or (bound == UPPER and score <= alpha)):
+            stats["hits"] += 1
+            return score
+
+    stats["nodes"] += 1
+    if (deadline is not None and stats["nodes"] % CHECK_INTERVAL == 0
+            and time.monotonic() > deadline):
+        raise SearchTimeout
+
+    taken = me | them
+    if taken == shape.full:
+        return 0
+    if depth == 0:
+        return evaluate(shape, me, them)
+
+    # Search the previous best cell first, then from the center outwards
+    window = (alpha, beta)
+    cells = [cell for cell in shape.order if not taken >> cell & 1]
+    if best_cell in cells:
+        cells.remove(best_cell)
+        cells.insert(0, best_cell)
+
+    score = -math.inf
+    for cell in cells:
+        mine = me | 1 << cell
+        if shape.holds_line_through(mine, cell):
+            child = WIN - (taken.bit_count() + 1)
+        else:
+            child = -negamax(shape, them, mine, depth - 1, -beta, -alpha,
+                             table, deadline)
+        if child > score:
+            score, best_cell = child, cell
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+
+    if score <= window[0]:
+        bound = UPPER
+    elif score >= window[1]:
+        bound = LOWER
+    else:
+        bound = EXACT
+    table[key] = (depth, bound, score, best_cell)
+    return score
+
+
+def evaluate(shape, me, them):
+    """
+    Returns a heuristic score, for the player holding `me`, of a bitboard
+    where the game is not over: each line that only one player has marks
+    on counts 4 to the power of their marks on it in their favor.
+    """
+    score = 0
+    for line in shape.lines:
+        mine = me & line
+        theirs = them & line
+        if mine and not theirs:
+            score += 1 << 2 * mine.bit_count()
+        elif theirs and not mine:
+            score -= 1 << 2 * theirs.bit_count()
+    return score
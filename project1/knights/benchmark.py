@@ -0,0 +1,224 @@
+"""
+Benchmarks for model checking in logic.py.
+
+Generates knights-and-knaves puzzles with 3 to 12 characters (6 to 24
+symbols) and times checking a query that holds in every model by
+enumerating every model, as model_check did before it pruned decided
+branches, with model_check and with model_check_compiled, and by
+refutation with the SAT solver in sat.py, which is then run alone on
+puzzles with up to thousands of characters.
+
+Then times queries about every symbol of a puzzle against a
+KnowledgeBase and a SATKnowledgeBase built once and warmed up by
+answering each query once, next to model_check_compiled checking the
+whole knowledge base again for each query.
+
+Last, counts the partial models model_check visits, pruning branches
+once the knowledge base or the query is decided, when asked about each
+character in the knowledge bases of puzzle.py, against the 2^n models
+it would otherwise enumerate.
+
+Usage: python benchmark.py [--max-enumerated N] [--seed S]
+"""
+import argparse
+import random
+import time
+
+import logic
+import puzzle
+from logic import *
+from sat import SATKnowledgeBase, entails
+
+# Characters in the larger puzzles only the SAT solver is run on
+SAT_CHARACTERS = [50, 100, 500, 1000, 2000]
+
+# Characters in the puzzles queried against knowledge bases
+QUERY_CHARACTERS = [3, 6, 8, 10]
+
+
+def generate_puzzle(characters, rng):
+    """
+    Returns (knowledge, knights, knaves) for a random puzzle where each
+    of a number of characters is a knight or a knave, but not both, and
+    makes one statement about another character.
+
+    The puzzle has a solution: each character is first made a knight or
+    a knave at random, and a statement that does not match its speaker,
+    true from a knight and false from a knave, is negated.
+    """
+    knights = [Symbol(f"{i} is a Knight") for i in range(characters)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(characters)]
+    model = {}
+    for i in range(characters):
+        knight = rng.random() < 0.5
+        model[knights[i].name] = knight
+        model[knaves[i].name] = not knight
+
+    conjuncts = []
+    for i in range(characters):
+        conjuncts.append(Biconditional(knights[i], Not(knaves[i])))
+    for i in range(characters):
+        j = (i + rng.randrange(1, characters)) % characters
+        statement = rng.choice([
+            knaves[j],
+            knights[j],
+            Or(And(knights[i], knights[j]), And(knaves[i], knaves[j])),
+            Implication(knights[j], knaves[i])
+        ])
+        if statement.evaluate(model) != model[knights[i].name]:
+            statement = Not(statement)
+        conjuncts.append(Biconditional(knights[i], statement))
+    return And(*conjuncts), knights, knaves
+
+
+def model_check_enumerated(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating both in every
+    model of their symbols, the reference model_check and
+    model_check_compiled are timed against.
+    """
+
+    def check_all(symbols, model):
+        if not symbols:
+            return not knowledge.evaluate(model) or query.evaluate(model)
+        remaining = symbols.copy()
+        p = remaining.pop()
+        return (check_all(remaining, {**model, p: True}) and
+                check_all(remaining, {**model, p: False}))
+
+    return check_all(set(knowledge.symbols() | query.symbols()), {})
+
+
+def timed(check, knowledge, query):
+    """
+    Returns (result, seconds) of checking whether knowledge entails query.
+    """
+    start = time.perf_counter()
+    entailed = check(knowledge, query)
+    return entailed, time.perf_counter() - start
+
+
+def per_query(make, knowledge, queries):
+    """
+    Returns (answers, seconds to build, seconds per query) of a knowledge
+    base made from knowledge's conjuncts, timing the queries after asking
+    each once to warm up.
+    """
+    start = time.perf_counter()
+    base = make(*knowledge.conjuncts)
+    built = time.perf_counter() - start
+    for query in queries:
+        base.ask(query)
+    start = time.perf_counter()
+    answers = [base.ask(query) for query in queries]
+    return answers, built, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--max-enumerated", type=int, default=20,
+                        help="most symbols to enumerate models of "
+                             "(default: 20)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'symbols':>7} {'models':>10} {'enumerated':>12} "
+          f"{'model_check':>12} {'compiled':>10} {'speedup':>8} {'sat':>10}")
+    for characters in range(3, 13):
+        knowledge, knights, knaves = generate_puzzle(characters, rng)
+        if not SATKnowledgeBase(knowledge).satisfiable():
+            raise Exception(f"puzzle has no solution: {knowledge.formula()}")
+
+        # Every character is a knight or a knave, so the query is entailed
+        query = Or(knights[0], knaves[0])
+        symbols = 2 * characters
+        entailed, compiled = timed(model_check_compiled, knowledge, query)
+        refuted, solved = timed(entails, knowledge, query)
+        if refuted != entailed:
+            raise Exception(f"SAT solver disagrees on {knowledge.formula()}")
+        if symbols <= args.max_enumerated:
+            expected, enumerated = timed(model_check_enumerated,
+                                         knowledge, query)
+            pruned_result, pruned = timed(model_check, knowledge, query)
+            if entailed != expected or pruned_result != expected:
+                raise Exception(f"engines disagree on {knowledge.formula()}")
+
+            # Cross-check each engine on queries that are not entailed too
+            for symbol in knights + knaves:
+                expected = model_check_enumerated(knowledge, symbol)
+                if (expected != model_check(knowledge, symbol)
+                        or expected != model_check_compiled(knowledge, symbol)
+                        or expected != entails(knowledge, symbol)):
+                    raise Exception(f"engines disagree on {symbol}")
+            speedup = f"{enumerated / compiled:7.1f}x"
+            enumerated = f"{enumerated * 1000:10.1f}ms"
+            pruned = f"{pruned * 1000:10.1f}ms"
+        else:
+            enumerated = pruned = f"{'skipped':>12}"
+            speedup = f"{'-':>8}"
+        print(f"{symbols:>7} {2 ** symbols:>10} {enumerated} {pruned} "
+              f"{compiled * 1000:8.2f}ms {speedup} {solved * 1000:8.2f}ms")
+
+    for characters in SAT_CHARACTERS:
+        knowledge, knights, knaves = generate_puzzle(characters, rng)
+        if not SATKnowledgeBase(knowledge).satisfiable():
+            raise Exception(f"puzzle of {characters} characters has no solution")
+        query = Or(knights[0], knaves[0])
+        refuted, solved = timed(entails, knowledge, query)
+        if not refuted:
+            raise Exception(f"SAT solver fails to refute ¬{query.formula()}")
+        print(f"{2 * characters:>7} {'2^' + str(2 * characters):>10} "
+              f"{'skipped':>12} {'skipped':>12} {'skipped':>10} {'-':>8} "
+              f"{solved * 1000:8.2f}ms")
+
+    print()
+    print(f"{'symbols':>7} {'queries':>7} {'compiled':>10} "
+          f"{'kb build':>10} {'kb query':>10} {'sat build':>10} {'sat query':>10}")
+    for characters in QUERY_CHARACTERS + SAT_CHARACTERS:
+        knowledge, knights, knaves = generate_puzzle(characters, rng)
+        if not SATKnowledgeBase(knowledge).satisfiable():
+            raise Exception(f"puzzle of {characters} characters has no solution")
+        queries = knights + knaves
+        sat_answers, sat_built, sat_query = per_query(
+            SATKnowledgeBase, knowledge, queries)
+        if characters in SAT_CHARACTERS:
+            compiled = kb_built = kb_query = f"{'skipped':>10}"
+        else:
+            start = time.perf_counter()
+            expected = [model_check_compiled(knowledge, query)
+                        for query in queries]
+            compiled = (time.perf_counter() - start) / len(queries)
+            answers, kb_built, kb_query = per_query(
+                KnowledgeBase, knowledge, queries)
+            if answers != expected or sat_answers != expected:
+                raise Exception(f"knowledge bases disagree on "
+                                f"{knowledge.formula()}")
+            compiled = f"{compiled * 1000:8.3f}ms"
+            kb_built = f"{kb_built * 1000:8.3f}ms"
+            kb_query = f"{kb_query * 1e6:8.1f}us"
+        print(f"{2 * characters:>7} {len(queries):>7} {compiled} {kb_built} "
+              f"{kb_query} {sat_built * 1000:8.3f}ms {sat_query * 1e6:8.1f}us")
+
+    print()
+    print(f"{'puzzle':>7} {'queries':>7} {'models':>10} {'visited':>10} "
+          f"{'pruned':>8}")
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight, puzzle.BKnave,
+               puzzle.CKnight, puzzle.CKnave]
+    knowledge_bases = [puzzle.knowledge0, puzzle.knowledge1,
+                       puzzle.knowledge2, puzzle.knowledge3]
+    for number, knowledge in enumerate(knowledge_bases):
+        models = 0
+        logic.stats["models"] = 0
+        for symbol in symbols:
+            if model_check(knowledge, symbol) != model_check_compiled(
+                    knowledge, symbol):
+                raise Exception(f"engines disagree on {symbol}")
+            models += 2 ** len(knowledge.symbols() | symbol.symbols())
+        visited = logic.stats["models"]
+        print(f"{number:>7} {len(symbols):>7} {models:>10} {visited:>10} "
+              f"{1 - visited / models:>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,129 @@
 import itertools
+import weakref
+
+# Instructions of compiled sentences, each applied to a stack of truth
+# tables: push a symbol's table, or combine the tables on top
+SYMBOL = "symbol"
+NOT = "not"
+AND = "and"
+OR = "or"
+IMPLIES = "implies"
+BICONDITIONAL = "biconditional"
+
+# Partial models model_check has visited, each a complete model or one
+# whose completions were all decided at once
+stats = {"models": 0}
+
+# Number of symbols whose truth values vary within one chunk of models
+# in compiled model checking, so that chunks hold 2 ** CHUNK_SYMBOLS models
+CHUNK_SYMBOLS = 20
 
 
 class Sentence():
+    """
+    Sentences are immutable and interned: constructing a sentence equal
+    to one that already exists returns that one, so that equal sentences
+    are identical and share their subsentences. Each sentence computes
+    its hash once, when created, and its symbols once, when first asked.
+    """
+    __slots__ = ("cached_hash", "cached_symbols", "__weakref__")
+
+    # Every sentence in use, by class and fields
+    interned = weakref.WeakValueDictionary()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"cannot set {name}: sentences are immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"cannot delete {name}: sentences are immutable")
+
+    def __hash__(self):
+        return self.cached_hash
+
+    def __reduce__(self):
+        # Copied and unpickled sentences are interned again
+        return type(self), self.arguments()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a model that may leave symbols
+        unassigned, returning None if its value depends on them.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozen set of all symbols in the logical sentence."""
+        symbols = self.cached_symbols
+        if symbols is None:
+            symbols = self.find_symbols()
+            object.__setattr__(self, "cached_symbols", symbols)
+        return symbols
+
+    def compile(self, program, index):
+        """
+        Appends instructions computing the sentence's truth table to
+        program, where index maps each symbol to its position.
+        """
+        raise Exception("nothing to compile")
+
+    def arguments(self):
+        """Returns the arguments that construct the sentence."""
+        return tuple(getattr(self, name) for name in type(self).__slots__)
+
+    def children(self):
+        """Returns the sentence's immediate subsentences."""
+        return ()
+
+    def digest(self):
+        """Computes the hash of the sentence."""
+        return hash(type(self).__name__)
+
+    def find_symbols(self):
+        """
+        Computes the frozen set of all symbols in the sentence, visiting
+        each shared subsentence once and without caching the symbols of
+        subsentences that have not been asked for theirs.
+        """
+        names = set()
+        visited = {self}
+        pending = list(self.children())
+        while pending:
+            sentence = pending.pop()
+            if sentence in visited:
+                continue
+            visited.add(sentence)
+            if sentence.cached_symbols is not None:
+                names |= sentence.cached_symbols
+            elif isinstance(sentence, Symbol):
+                names.add(sentence.name)
+            else:
+                pending.extend(sentence.children())
+        return frozenset(names)
+
+    @classmethod
+    def intern(cls, *fields):
+        """
+        Returns the sentence of this class with these fields, in the
+        order of its __slots__, creating it if no equal sentence exists.
+        """
+        key = (cls, *fields)
+        sentence = Sentence.interned.get(key)
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in zip(cls.__slots__, fields):
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "cached_hash", sentence.digest())
+            object.__setattr__(sentence, "cached_symbols", None)
+            Sentence.interned[key] = sentence
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +153,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls.intern(name)
 
     def __repr__(self):
         return self.name
@@ -62,23 +167,29 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def digest(self):
+        return hash(("symbol", self.name))
 
+    def find_symbols(self):
+        return frozenset([self.name])
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    def compile(self, program, index):
+        program.append((SYMBOL, index[self.name]))
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+class Not(Sentence):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern(operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +197,31 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def children(self):
+        return (self.operand,)
+
+    def digest(self):
+        return hash(("not", hash(self.operand)))
+
+    def compile(self, program, index):
+        self.operand.compile(program, index)
+        program.append((NOT, None))
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        return cls.intern(conjuncts)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +230,52 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        raise TypeError("sentences are immutable: construct a new And, or "
+                        "add sentences to a KnowledgeBase")
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def arguments(self):
+        return self.conjuncts
+
+    def children(self):
+        return self.conjuncts
+
+    def digest(self):
+        return hash(
+            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+        )
+
+    def compile(self, program, index):
+        for conjunct in self.conjuncts:
+            conjunct.compile(program, index)
+        program.append((AND, len(self.conjuncts)))
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+    __slots__ = ("disjuncts",)
+
+    def __new__(cls, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
-
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        return cls.intern(disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +284,46 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def arguments(self):
+        return self.disjuncts
+
+    def children(self):
+        return self.disjuncts
+
+    def digest(self):
+        return hash(
+            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+        )
+
+    def compile(self, program, index):
+        for disjunct in self.disjuncts:
+            disjunct.compile(program, index)
+        program.append((OR, len(self.disjuncts)))
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return cls.intern(antecedent, consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +332,41 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is True and consequent is False:
+            return False
+        return None
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def children(self):
+        return (self.antecedent, self.consequent)
+
+    def digest(self):
+        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+
+    def compile(self, program, index):
+        self.antecedent.compile(program, index)
+        self.consequent.compile(program, index)
+        program.append((IMPLIES, None))
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        return cls.intern(left, right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,13 +377,30 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def children(self):
+        return (self.left, self.right)
+
+    def digest(self):
+        return hash(("biconditional", hash(self.left), hash(self.right)))
+
+    def compile(self, program, index):
+        self.left.compile(program, index)
+        self.right.compile(program, index)
+        program.append((BICONDITIONAL, None))
 
 
 def model_check(knowledge, query):
@@ -231,33 +409,211 @@ def model_check(knowledge, query):
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
 
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        # If knowledge base is already false, every completion of model
+        # satisfies entailment; if it is already true, the query decides
+        # every completion as soon as it is known
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            stats["models"] += 1
             return True
-        else:
+        if known is True:
+            entailed = query.evaluate_partial(model)
+            if entailed is not None:
+                stats["models"] += 1
+                return entailed
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
+        # Both are decided once every symbol is assigned, so some symbol
+        # is still unused: choose one of them
+        remaining = symbols.copy()
+        p = remaining.pop()
 
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
+        # Create a model where the symbol is true
+        model_true = model.copy()
+        model_true[p] = True
 
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+        # Create a model where the symbol is false
+        model_false = model.copy()
+        model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+        # Ensure entailment holds in both models
+        return (check_all(knowledge, query, remaining, model_true) and
+                check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def compile_sentence(sentence, index):
+    """
+    Returns the program of instructions computing a sentence's truth
+    table, where index maps each symbol to its position.
+    """
+    program = []
+    sentence.compile(program, index)
+    return program
+
+
+def truth_table(program, tables, full):
+    """
+    Runs a compiled program on the truth tables of its symbols, integers
+    holding the symbol's value in each model as one bit, with full
+    having every model's bit set. Returns the sentence's truth table.
+    """
+    stack = []
+    for instruction, argument in program:
+        if instruction == SYMBOL:
+            stack.append(tables[argument])
+        elif instruction == NOT:
+            stack.append(stack.pop() ^ full)
+        elif instruction == AND:
+            table = full
+            for _ in range(argument):
+                table &= stack.pop()
+            stack.append(table)
+        elif instruction == OR:
+            table = 0
+            for _ in range(argument):
+                table |= stack.pop()
+            stack.append(table)
+        elif instruction == IMPLIES:
+            consequent = stack.pop()
+            stack.append((stack.pop() ^ full) | consequent)
+        else:
+            right = stack.pop()
+            stack.append(stack.pop() ^ right ^ full)
+    return stack.pop()
+
+
+def symbol_tables(count):
+    """
+    Yields (tables, full) for each chunk of the 2 ** count models of
+    count symbols, where tables holds each symbol's truth table over the
+    chunk's models, and full has one bit set for each of them.
+    """
+    varying = min(count, CHUNK_SYMBOLS)
+    size = 1 << varying
+    full = (1 << size) - 1
+
+    # Symbol i is true in the upper half of every run of 2 ** (i + 1)
+    # models, built up by doubling the first run across the chunk
+    tables = []
+    for i in range(varying):
+        width = 1 << (i + 1)
+        table = ((1 << (width >> 1)) - 1) << (width >> 1)
+        while width < size:
+            table |= table << width
+            width <<= 1
+        tables.append(table)
+
+    # The remaining symbols have one truth value throughout each chunk
+    for chunk in range(1 << (count - varying)):
+        yield tables + [full if chunk >> i & 1 else 0
+                        for i in range(count - varying)], full
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query, as model_check does, by
+    compiling both once and computing their truth tables over many
+    models at a time, as bits of an integer.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    knowledge_program = compile_sentence(knowledge, index)
+    query_program = compile_sentence(query, index)
+
+    # Entailment fails if some model makes knowledge true and query false
+    for tables, full in symbol_tables(len(symbols)):
+        if (truth_table(knowledge_program, tables, full)
+                & ~truth_table(query_program, tables, full)):
+            return False
+    return True
+
+
+class KnowledgeBase():
+    """
+    A knowledge base that answers many queries, keeping its truth table
+    over every model of its symbols, one integer per chunk of models as
+    model_check_compiled computes them, so that each query only computes
+    its own truth table.
+
+    Sentences are added incrementally: one over known symbols is and-ed
+    into the truth table, and a new symbol, which the knowledge so far
+    does not mention, doubles the models by copying the table for each
+    of its values.
+    """
+
+    def __init__(self, *sentences):
+        self.conjuncts = []
+        self.symbols = []
+        self.index = {}
+
+        # Truth table of the knowledge in each chunk of models; with no
+        # symbols, the one empty model satisfies it
+        self.tables = [1]
+
+        # The symbols' truth tables in each chunk, built when first needed
+        self.symbol_tables = None
+        for sentence in sentences:
+            self.add(sentence)
+
+    def __repr__(self):
+        conjuncts = ", ".join([str(conjunct) for conjunct in self.conjuncts])
+        return f"KnowledgeBase({conjuncts})"
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.extend(sentence.symbols())
+        program = compile_sentence(sentence, self.index)
+        for chunk, (tables, full) in enumerate(self.chunks()):
+            if self.tables[chunk]:
+                self.tables[chunk] &= truth_table(program, tables, full)
+        self.conjuncts.append(sentence)
+
+    def extend(self, symbols):
+        """
+        Adds the symbols not yet in the knowledge base, in sorted order,
+        which the knowledge holds in the models of either of their values.
+        """
+        for symbol in sorted(set(symbols) - self.index.keys()):
+            count = len(self.symbols)
+            if count < CHUNK_SYMBOLS:
+                # The symbol varies within the one chunk, true in its
+                # upper half of models
+                self.tables[0] |= self.tables[0] << (1 << count)
+            else:
+                # The symbol is true in the upper half of the chunks
+                self.tables += self.tables
+            self.index[symbol] = count
+            self.symbols.append(symbol)
+            self.symbol_tables = None
+
+    def chunks(self):
+        """
+        Returns (tables, full) for each chunk of models, as symbol_tables
+        yields them for the knowledge base's symbols.
+        """
+        if self.symbol_tables is None:
+            self.symbol_tables = list(symbol_tables(len(self.symbols)))
+        return self.symbol_tables
+
+    def satisfiable(self):
+        """Checks if some model satisfies the knowledge base."""
+        return any(self.tables)
+
+    def ask(self, query):
+        """
+        Checks if the knowledge base entails query, as model_check does,
+        adding any symbols of query the knowledge base does not have.
+        """
+        Sentence.validate(query)
+        self.extend(query.symbols())
+        program = compile_sentence(query, self.index)
+        for chunk, (tables, full) in enumerate(self.chunks()):
+            if self.tables[chunk] & ~truth_table(program, tables, full):
+                return False
+        return True
@@ -103,8 +103,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # Enumerate the models once, and check each symbol against them
+            base = KnowledgeBase(*knowledge.conjuncts)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if base.ask(symbol):
                     print(f"    {symbol}")
 
 
@@ -0,0 +1,506 @@
+"""
+CNF conversion and a CDCL SAT solver for the sentences in logic.py.
+
+Sentences are converted to clauses with the Tseitin encoding, which
+names each compound subsentence with a fresh variable, so that the
+clauses grow linearly with the sentence. The solver uses two watched
+literals per clause for unit propagation, learns a first-UIP clause
+from each conflict, branches on the variable with the highest decaying
+activity, restarts on the Luby sequence, and can solve under
+assumptions.
+
+entails(knowledge, query) answers as model_check does, by checking that
+knowledge ∧ ¬query has no model, without enumerating 2^n models.
+"""
+import heapq
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Factor by which variable activities decay after each conflict
+ACTIVITY_DECAY = 0.95
+
+# Activity above which all activities are scaled down
+ACTIVITY_LIMIT = 1e100
+
+# Conflicts per unit of the Luby sequence between restarts
+RESTART_INTERVAL = 100
+
+
+class CNF():
+    """
+    Clauses of sentences in the Tseitin encoding, where variables are
+    numbered from 1 and a literal is a variable or its negation.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.clauses = []
+
+        # Maps symbol names to their variables
+        self.variables = {}
+
+        # Maps compound sentences to their literals, so that each shared
+        # subsentence is named once
+        self.literals = {}
+
+    def variable(self, name=None):
+        """
+        Returns the variable of a symbol name, or a fresh variable.
+        """
+        if name is not None and name in self.variables:
+            return self.variables[name]
+        self.count += 1
+        if name is not None:
+            self.variables[name] = self.count
+        return self.count
+
+    def add(self, sentence):
+        """
+        Adds clauses requiring sentence to be true.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when sentence is, adding
+        clauses defining any fresh variables it needs.
+        """
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        literal = self.literals.get(sentence)
+        if literal is not None:
+            return literal
+
+        clauses = self.clauses
+        if isinstance(sentence, And):
+            children = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            v = self.variable()
+            clauses.extend([-v, child] for child in children)
+            clauses.append([v] + [-child for child in children])
+        elif isinstance(sentence, Or):
+            children = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            v = self.variable()
+            clauses.extend([v, -child] for child in children)
+            clauses.append([-v] + children)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.variable()
+            clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.variable()
+            clauses.extend([[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]])
+        else:
+            raise TypeError("must be a logical sentence")
+
+        self.literals[sentence] = v
+        return v
+
+
+class Solver():
+    """
+    CDCL SAT solver over clauses of integer literals.
+    """
+
+    def __init__(self, variables=0):
+        self.count = 0
+
+        # Per variable, indexed from 1: value (1 true, -1 false, 0 unset),
+        # decision level, index of the clause that implied it, activity,
+        # and the value it last had
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+
+        # Per literal, at index 2 * variable + negated: the clauses
+        # watching it
+        self.watches = [[], []]
+
+        self.clauses = []
+        self.trail = []
+        self.trail_limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.inconsistent = False
+        self.model = None
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0,
+                      "restarts": 0, "learnt": 0}
+
+        for _ in range(variables):
+            self.new_variable()
+
+    def new_variable(self):
+        """
+        Returns a new variable.
+        """
+        self.count += 1
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.watches += [[], []]
+        heapq.heappush(self.heap, (0.0, self.count))
+        return self.count
+
+    def value(self, literal):
+        """
+        Returns 1 if literal is true, -1 if it is false, and 0 if unset.
+        """
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds a clause of literals, a list of nonzero integers, creating
+        any variables it mentions. Returns False if the clauses are now
+        known to be unsatisfiable.
+        """
+        self.backtrack(0)
+        clause = []
+        for literal in literals:
+            while abs(literal) > self.count:
+                self.new_variable()
+            value = self.value(literal)
+            if value == 1 or -literal in clause:
+                return not self.inconsistent
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+
+        if not clause:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.watch(clause)
+        return not self.inconsistent
+
+    def watch(self, clause):
+        """
+        Stores a clause, watching its first two literals, and returns
+        its index.
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        for literal in clause[:2]:
+            self.watches[2 * abs(literal) + (literal < 0)].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        """
+        Makes literal true at the current decision level.
+        """
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.trail_limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by a clause with one unset literal
+        left. Returns the index of a clause with every literal false, or
+        None if there is none.
+        """
+        values = self.values
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+        while self.head < len(trail):
+            false_literal = -trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+            watchers = watches[2 * abs(false_literal) + (false_literal < 0)]
+            i = j = 0
+            count = len(watchers)
+            while i < count:
+                index = watchers[i]
+                i += 1
+                clause = clauses[index]
+
+                # Keep the false literal second, and the other watch first
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                first_value = values[abs(first)] if first > 0 else -values[abs(first)]
+                if first_value == 1:
+                    watchers[j] = index
+                    j += 1
+                    continue
+
+                # Move the watch to another literal that is not false
+                for k in range(2, len(clause)):
+                    literal = clause[k]
+                    value = values[abs(literal)]
+                    if (value if literal > 0 else -value) != -1:
+                        clause[1], clause[k] = literal, false_literal
+                        watches[2 * abs(literal) + (literal < 0)].append(index)
+                        break
+                else:
+                    # The clause is unit or conflicting, and stays watched
+                    watchers[j] = index
+                    j += 1
+                    if first_value == -1:
+                        watchers[j:] = watchers[i:count]
+                        return index
+                    self.assign(first, index)
+            del watchers[j:]
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (learnt clause, level to go back to) for the clause at
+        index conflict, where the learnt clause's first literal is the
+        negation of the first unique implication point.
+        """
+        level = len(self.trail_limits)
+        learnt = [None]
+        seen = set()
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learnt.append(other)
+
+            # Resolve with the reason of the latest literal involved
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learnt[0] = -literal
+
+        # Go back to the latest level among the other literals, and
+        # watch a literal from it second
+        back = 0
+        for i in range(1, len(learnt)):
+            if self.levels[abs(learnt[i])] > back:
+                back = self.levels[abs(learnt[i])]
+                learnt[1], learnt[i] = learnt[i], learnt[1]
+        return learnt, back
+
+    def bump(self, variable):
+        """
+        Raises a variable's activity, scaling all down if it grows too big.
+        """
+        self.activity[variable] += self.increment
+        if self.activity[variable] > ACTIVITY_LIMIT:
+            self.activity = [activity / ACTIVITY_LIMIT
+                             for activity in self.activity]
+            self.increment /= ACTIVITY_LIMIT
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.count + 1) if not self.values[v]]
+            heapq.heapify(self.heap)
+        elif not self.values[variable]:
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        """
+        Unassigns every literal above the decision level.
+        """
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phases[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.heap, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.head = start
+
+    def decide(self):
+        """
+        Returns the unset variable with the highest activity, or None if
+        every variable is set.
+        """
+        while self.heap:
+            _, variable = heapq.heappop(self.heap)
+            if not self.values[variable]:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses, together with the assumed literals,
+        are satisfiable, and False otherwise. A satisfying assignment is
+        kept in model, as a list of literals.
+        """
+        self.model = None
+        if self.inconsistent:
+            return False
+        self.backtrack(0)
+        if self.propagate() is not None:
+            self.inconsistent = True
+            return False
+
+        restarts = 0
+        limit = luby(restarts) * RESTART_INTERVAL
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                conflicts += 1
+                if not self.trail_limits:
+                    self.inconsistent = True
+                    return False
+                learnt, back = self.analyze(conflict)
+                self.backtrack(back)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.watch(learnt))
+                    self.stats["learnt"] += 1
+                self.increment /= ACTIVITY_DECAY
+                continue
+
+            if conflicts >= limit:
+                self.stats["restarts"] += 1
+                restarts += 1
+                limit = luby(restarts) * RESTART_INTERVAL
+                conflicts = 0
+                self.backtrack(0)
+                continue
+
+            # Decide the assumptions first, one level each
+            level = len(self.trail_limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                while abs(literal) > self.count:
+                    self.new_variable()
+                value = self.value(literal)
+                if value == -1:
+                    self.backtrack(0)
+                    return False
+                self.trail_limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.decide()
+            if variable is None:
+                self.model = [v if self.values[v] == 1 else -v
+                              for v in range(1, self.count + 1)]
+                self.backtrack(0)
+                return True
+            self.stats["decisions"] += 1
+            self.trail_limits.append(len(self.trail))
+            self.assign(variable if self.phases[variable] else -variable, None)
+
+
+def luby(i):
+    """
+    Returns the ith term of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    counting from 0.
+    """
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+def entails(knowledge, query):
+    """
+    Checks if knowledge base entails query, as model_check does, by
+    checking that knowledge ∧ ¬query is unsatisfiable.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    solver = Solver(cnf.count)
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+class SATKnowledgeBase():
+    """
+    A knowledge base with the interface of logic.KnowledgeBase, kept as
+    the clauses of one solver, for knowledge bases with too many symbols
+    to enumerate their models. Sentences add clauses to the solver, and
+    each query is refuted under the assumption that it is false, so that
+    clauses learnt answering one query speed up the next.
+    """
+
+    def __init__(self, *sentences):
+        self.conjuncts = []
+        self.cnf = CNF()
+        self.solver = Solver()
+
+        # Number of the CNF's clauses added to the solver
+        self.loaded = 0
+        for sentence in sentences:
+            self.add(sentence)
+
+    def __repr__(self):
+        conjuncts = ", ".join([str(conjunct) for conjunct in self.conjuncts])
+        return f"SATKnowledgeBase({conjuncts})"
+
+    def load(self):
+        """Adds the CNF's new clauses to the solver."""
+        for clause in self.cnf.clauses[self.loaded:]:
+            self.solver.add_clause(clause)
+        self.loaded = len(self.cnf.clauses)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        self.cnf.add(sentence)
+        self.load()
+        self.conjuncts.append(sentence)
+
+    def satisfiable(self):
+        """Checks if some model satisfies the knowledge base."""
+        return self.solver.solve()
+
+    def ask(self, query):
+        """
+        Checks if the knowledge base entails query, as model_check does.
+        """
+        # The clauses defining the query's literal hold in every model
+        # once it is given the query's value, so they are kept
+        literal = self.cnf.literal(query)
+        self.load()
+        return not self.solver.solve([-literal])